@@ -4,11 +4,12 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 import os
 from dotenv import load_dotenv
+from .replica import SessionRoteada
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessionRoteada})
 migrate = Migrate()
 login_manager = LoginManager()
 
@@ -22,6 +23,15 @@ def create_app(config_name=None):
     db.init_app(app)
     migrate.init_app(app, db)
     
+    # WAL e demais PRAGMAs quando o banco for SQLite
+    from . import perfil_sqlite
+    perfil_sqlite.init_app(app, db)
+    
+    # Inspeção opcional de consultas (N+1, orçamento por rota); registrada antes
+    # dos demais hooks para contar também as consultas deles
+    from . import inspecao
+    inspecao.init_app(app, db)
+    
     # Configurar Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -31,7 +41,12 @@ def create_app(config_name=None):
     @login_manager.user_loader
     def load_user(user_id):
         from .models import Usuario
-        return Usuario.query.get(int(user_id))
+        # Antes de a loja da requisição ser conhecida: busca em todas as lojas
+        return Usuario.query.execution_options(todas_lojas=True).filter_by(id=int(user_id)).first()
+    
+    # URLs estáticas com impressão digital e cache imutável
+    from . import assets
+    assets.init_app(app)
     
     # Registrar blueprints
     from .routes import bp as main_bp
@@ -43,4 +58,31 @@ def create_app(config_name=None):
     # Importar modelos para que o Flask-Migrate os reconheça
     from . import models
     
+    # Particionamento por loja: filtro automático das consultas pela loja da sessão
+    from . import lojas
+    
+    @app.before_request
+    def carregar_loja():
+        lojas.carregar_loja_da_sessao(db)
+    
+    @app.context_processor
+    def injetar_loja():
+        return {'loja_atual': db.session.get(models.Loja, lojas.loja_atual_id())}
+    
+    # Registrar eventos de versionamento dos dados (ETags das páginas admin)
+    # e o cache em disco das exportações
+    from . import cache
+    cache.init_app(app)
+    
+    # Índice de prefixos dos nomes de hortifrúti (typeahead)
+    from . import busca
+    
+    # Buffer opcional de ingestão em lote dos registros de avaria
+    from . import ingestao
+    ingestao.init_app(app)
+    
+    # Comandos de linha de comando (flask criar-loja, ...)
+    from . import comandos
+    comandos.init_app(app)
+    
     return app
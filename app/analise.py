@@ -0,0 +1,167 @@
+from datetime import datetime
+from sqlalchemy import select, func
+from . import db
+from .models import Produto, Avaria
+from .lojas import loja_atual_id
+from .cache import versao_dados
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # análises são opcionais: sem NumPy a página mostra só as contagens
+    np = None
+
+# Dias considerados nas séries diárias e na detecção de dias atípicos
+JANELA_DIAS = 90
+# Dias da média móvel
+MEDIA_MOVEL_DIAS = 7
+# Dias mostrados no gráfico da página de estatísticas
+DIAS_GRAFICO = 30
+# Limite do z-score robusto (mediana/MAD) para marcar um dia como atípico
+LIMITE_ATIPICO = 3.5
+PERCENTIS = (0.5, 0.9)
+
+_cache = {}
+_lock = threading.Lock()
+
+# Linhas convertidas em arrays por vez na carga das colunas
+TAMANHO_LOTE = 100_000
+
+def carregar_colunas(loja_id=None):
+    """Lê as colunas usadas nas análises em uma consulta e devolve arrays colunares.
+
+    As datas viram números de dia (dias desde 1970-01-01), `peso` e `quantidade`
+    viram float com NaN para valores ausentes. A consulta roda no Core (sem montar
+    linhas ORM) e é convertida em lotes, sem guardar todas as tuplas em memória.
+    """
+    stmt = select(
+        Avaria.produto_id, Avaria.peso, Avaria.quantidade, func.date(Avaria.data_registro)
+    ).where(Avaria.loja_id == (loja_id or loja_atual_id()))
+    resultado = db.session.connection(bind_arguments={'clause': stmt}).execute(stmt)
+
+    lotes = []
+    for linhas in resultado.partitions(TAMANHO_LOTE):
+        produto, peso, quantidade, data = zip(*linhas)
+        lotes.append((
+            np.array(produto, dtype=np.int64),
+            np.array(peso, dtype=float),
+            np.array(quantidade, dtype=float),
+            # SQLite devolve 'AAAA-MM-DD' e o PostgreSQL objetos date: o NumPy converte os dois
+            np.array(data, dtype='datetime64[D]').astype(np.int64),
+        ))
+    nomes = ('produto', 'peso', 'quantidade', 'dia')
+    if not lotes:
+        return {nome: np.empty(0, dtype=tipo) for nome, tipo in zip(nomes, (np.int64, float, float, np.int64))}
+    return {nome: np.concatenate(partes) for nome, partes in zip(nomes, zip(*lotes))}
+
+def _variacao(atual, anterior):
+    if not anterior:
+        return None
+    return round((atual - anterior) / anterior * 100, 1)
+
+def _percentis_por_produto(produto, valores):
+    """Percentis de `valores` por produto com um lexsort e aritmética de índices"""
+    validos = ~np.isnan(valores)
+    produto, valores = produto[validos], valores[validos]
+    if not len(valores):
+        return {}
+    ordem = np.lexsort((valores, produto))
+    produto, valores = produto[ordem], valores[ordem]
+    inicios = np.flatnonzero(np.r_[True, produto[1:] != produto[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(produto)])
+
+    resultado = []
+    for q in PERCENTIS:
+        # Interpolação linear, como np.percentile, feita para todos os grupos de uma vez
+        posicao = inicios + (tamanhos - 1) * q
+        baixo = np.floor(posicao).astype(np.int64)
+        alto = np.ceil(posicao).astype(np.int64)
+        resultado.append(valores[baixo] + (valores[alto] - valores[baixo]) * (posicao - baixo))
+    return {
+        int(p): {f'p{round(q * 100)}': round(float(r[i]), 2) for q, r in zip(PERCENTIS, resultado)}
+        for i, p in enumerate(produto[inicios])
+    }
+
+def calcular(colunas, hoje, top=10):
+    """Calcula séries diárias, média móvel, variação semanal, percentis e dias atípicos"""
+    dia_hoje = int(np.datetime64(hoje, 'D').astype(np.int64))
+    # A série começa MEDIA_MOVEL_DIAS - 1 dias antes para a média já valer no primeiro dia
+    extensao = JANELA_DIAS + MEDIA_MOVEL_DIAS - 1
+    inicio = dia_hoje - extensao + 1
+
+    dias = colunas['dia']
+    na_janela = (dias >= inicio) & (dias <= dia_hoje)
+    deslocamento = dias[na_janela] - inicio
+    registros = np.bincount(deslocamento, minlength=extensao)
+    peso = np.bincount(deslocamento, weights=np.nan_to_num(colunas['peso'][na_janela]), minlength=extensao)
+    quantidade = np.bincount(deslocamento, weights=np.nan_to_num(colunas['quantidade'][na_janela]), minlength=extensao)
+
+    acumulado = np.cumsum(np.r_[0, registros])
+    media_movel = (acumulado[MEDIA_MOVEL_DIAS:] - acumulado[:-MEDIA_MOVEL_DIAS]) / MEDIA_MOVEL_DIAS
+    registros = registros[MEDIA_MOVEL_DIAS - 1:]
+    datas = np.arange(dia_hoje - JANELA_DIAS + 1, dia_hoje + 1).astype('datetime64[D]')
+
+    serie = [
+        {'data': d.item().strftime('%d/%m'), 'registros': int(r), 'media_movel': round(float(m), 2)}
+        for d, r, m in zip(datas[-DIAS_GRAFICO:], registros[-DIAS_GRAFICO:], media_movel[-DIAS_GRAFICO:])
+    ]
+
+    semana = {}
+    for nome, valores in (('registros', registros), ('peso', peso), ('quantidade', quantidade)):
+        atual, anterior = float(valores[-7:].sum()), float(valores[-14:-7].sum())
+        semana[nome] = {'atual': round(atual, 2), 'anterior': round(anterior, 2), 'variacao': _variacao(atual, anterior)}
+
+    # Dias atípicos: z-score robusto sobre a janela, só picos (dias com mais perdas)
+    mediana = np.median(registros)
+    escala = 1.4826 * np.median(np.abs(registros - mediana)) or registros.std()
+    atipicos = []
+    if escala:
+        pontuacao = (registros - mediana) / escala
+        for i in np.flatnonzero(pontuacao > LIMITE_ATIPICO)[::-1]:
+            atipicos.append({
+                'data': datas[i].item().strftime('%d/%m/%Y'),
+                'registros': int(registros[i]),
+                'pontuacao': round(float(pontuacao[i]), 1),
+            })
+
+    # Percentis por produto para os produtos com mais registros
+    ids, contagens = np.unique(colunas['produto'], return_counts=True)
+    principais = ids[np.argsort(-contagens, kind='stable')[:top]]
+    percentis_peso = _percentis_por_produto(colunas['produto'], colunas['peso'])
+    percentis_quantidade = _percentis_por_produto(colunas['produto'], colunas['quantidade'])
+    contagem = dict(zip(ids.tolist(), contagens.tolist()))
+    percentis = [{
+        'produto_id': int(p),
+        'registros': contagem[int(p)],
+        'peso': percentis_peso.get(int(p)),
+        'quantidade': percentis_quantidade.get(int(p)),
+    } for p in principais]
+
+    return {
+        'serie': serie,
+        'semana': semana,
+        'atipicos': atipicos,
+        'percentis': percentis,
+    }
+
+def resumo_analitico():
+    """Análises da loja atual, recalculadas só quando os dados ou o dia mudam"""
+    if np is None:
+        return None
+    loja_id = loja_atual_id()
+    chave = (versao_dados(loja_id), datetime.now().date())
+    with _lock:
+        em_cache = _cache.get(loja_id)
+    if em_cache and em_cache[0] == chave:
+        return em_cache[1]
+
+    resultado = calcular(carregar_colunas(loja_id), chave[1])
+    nomes = dict(db.session.execute(
+        select(Produto.id, Produto.nome).where(Produto.id.in_([p['produto_id'] for p in resultado['percentis']]))
+    ).all())
+    for item in resultado['percentis']:
+        item['nome'] = nomes.get(item['produto_id'], '?')
+
+    with _lock:
+        _cache[loja_id] = (chave, resultado)
+    return resultado
@@ -0,0 +1,47 @@
+from flask import request
+import hashlib
+import os
+
+# Um ano: arquivos com impressão digital nunca mudam sob a mesma URL
+MAX_AGE_IMUTAVEL = 31536000
+
+def calcular_hashes(pasta):
+    """Mapeia cada arquivo da pasta estática para o hash do seu conteúdo"""
+    hashes = {}
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            relativo = os.path.relpath(caminho, pasta).replace(os.sep, '/')
+            with open(caminho, 'rb') as f:
+                hashes[relativo] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return hashes
+
+def versao_cache(hashes):
+    """Versão do cache do service worker derivada de todos os hashes"""
+    conteudo = '\n'.join(f'{nome}:{h}' for nome, h in sorted(hashes.items()))
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:12]
+
+def init_app(app):
+    """Calcula os hashes na inicialização e aplica-os às URLs estáticas"""
+    hashes = calcular_hashes(app.static_folder)
+    app.extensions['assets'] = {
+        'hashes': hashes,
+        'versao': versao_cache(hashes),
+    }
+
+    @app.url_defaults
+    def adicionar_impressao_digital(endpoint, values):
+        # url_for('static', filename=...) passa a gerar /static/<arquivo>?v=<hash>
+        if endpoint == 'static' and 'v' not in values:
+            h = hashes.get(values.get('filename'))
+            if h:
+                values['v'] = h
+
+    @app.after_request
+    def cache_imutavel(response):
+        # Só é imutável se o hash pedido corresponder ao conteúdo atual
+        v = request.args.get('v')
+        if (v and request.endpoint == 'static' and response.status_code == 200
+                and v == hashes.get((request.view_args or {}).get('filename'))):
+            response.headers['Cache-Control'] = f'public, max-age={MAX_AGE_IMUTAVEL}, immutable'
+        return response
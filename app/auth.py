@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse
 from . import db
 from .models import Usuario
+from .lojas import selecionar_loja
 from datetime import datetime
 
 bp = Blueprint('auth', __name__)
@@ -22,9 +23,13 @@ def login():
             flash('Por favor, preencha todos os campos.', 'error')
             return render_template('auth/login.html')
         
-        user = Usuario.query.filter_by(username=username).first()
+        # Nome de usuário é único entre todas as lojas
+        user = Usuario.query.filter_by(username=username).execution_options(todas_lojas=True).first()
         
         if user and user.check_password(password):
+            # A sessão passa a operar na loja do usuário
+            selecionar_loja(user.loja_id)
+            
             # Atualizar último login
             user.last_login = datetime.utcnow()
             db.session.commit()
@@ -78,12 +83,12 @@ def register():
             flash('A senha deve ter pelo menos 6 caracteres.', 'error')
             return render_template('auth/register.html', admin_exists=admin_exists)
         
-        # Verificar se usuário já existe
-        if Usuario.query.filter_by(username=username).first():
+        # Verificar se usuário já existe (em qualquer loja)
+        if Usuario.query.filter_by(username=username).execution_options(todas_lojas=True).first():
             flash('Nome de usuário já existe.', 'error')
             return render_template('auth/register.html', admin_exists=admin_exists)
         
-        if Usuario.query.filter_by(email=email).first():
+        if Usuario.query.filter_by(email=email).execution_options(todas_lojas=True).first():
             flash('Email já cadastrado.', 'error')
             return render_template('auth/register.html', admin_exists=admin_exists)
         
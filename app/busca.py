@@ -0,0 +1,107 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from bisect import bisect_left, insort
+from .models import Produto
+import threading
+import time
+import unicodedata
+
+def normalizar(texto):
+    """Forma de comparação: sem acentos, sem distinção de maiúsculas e espaços colapsados"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+class IndicePrefixo:
+    """Nomes de produtos hortifrúti por loja, ordenados pela forma normalizada.
+
+    Cada loja guarda uma lista ordenada de (chave, nome, id); a busca por prefixo
+    é um bisect seguido de uma varredura curta. O índice é montado na primeira
+    consulta, atualizado pelos commits deste processo e remontado após `ttl`
+    segundos para refletir escritas de outros processos.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lojas = {}
+        self._lock = threading.Lock()
+
+    def _entradas(self, loja_id):
+        indice = self._lojas.get(loja_id)
+        if indice is None or time.monotonic() - indice[0] > self.ttl:
+            produtos = Produto.query.with_entities(Produto.id, Produto.nome).filter(
+                Produto.loja_id == loja_id, Produto.tipo == 'hortifruti'
+            ).all()
+            entradas = sorted((normalizar(nome), nome, produto_id) for produto_id, nome in produtos)
+            indice = (time.monotonic(), entradas)
+            with self._lock:
+                self._lojas[loja_id] = indice
+        return indice[1]
+
+    def sugerir(self, loja_id, prefixo, limite=8):
+        """Até `limite` nomes distintos (pela forma normalizada) que começam com o prefixo"""
+        chave = normalizar(prefixo)
+        if not chave:
+            return []
+        entradas = self._entradas(loja_id)
+        sugestoes, vistas = [], set()
+        for i in range(bisect_left(entradas, (chave,)), len(entradas)):
+            normalizado, nome, _ = entradas[i]
+            if not normalizado.startswith(chave) or len(sugestoes) >= limite:
+                break
+            if normalizado not in vistas:
+                vistas.add(normalizado)
+                sugestoes.append(nome)
+        return sugestoes
+
+    def buscar(self, loja_id, nome):
+        """Id do produto cujo nome normalizado é igual ao informado, se existir"""
+        chave = normalizar(nome)
+        entradas = self._entradas(loja_id)
+        i = bisect_left(entradas, (chave,))
+        if i < len(entradas) and entradas[i][0] == chave:
+            return entradas[i][2]
+        return None
+
+    def adicionar(self, loja_id, produto_id, nome):
+        with self._lock:
+            indice = self._lojas.get(loja_id)
+            if indice is not None:
+                insort(indice[1], (normalizar(nome), nome, produto_id))
+
+    def invalidar(self, loja_id=None):
+        with self._lock:
+            if loja_id is None:
+                self._lojas.clear()
+            else:
+                self._lojas.pop(loja_id, None)
+
+indice_hortifruti = IndicePrefixo()
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_alteracoes(sess, flush_context):
+    """Guarda as alterações de produtos até o commit (um rollback as descarta)"""
+    pendentes = sess.info.setdefault('indice_produtos', [])
+    for obj in sess.new:
+        if isinstance(obj, Produto) and obj.tipo == 'hortifruti':
+            pendentes.append(('adicionar', obj.loja_id, obj.id, obj.nome))
+    for obj in list(sess.dirty) + list(sess.deleted):
+        if isinstance(obj, Produto) and obj.tipo == 'hortifruti':
+            pendentes.append(('invalidar', obj.loja_id))
+
+@event.listens_for(Session, 'do_orm_execute')
+def _registrar_em_massa(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, Produto):
+        orm_execute_state.session.info.setdefault('indice_produtos', []).append(('invalidar', None))
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_alteracoes(sess):
+    for operacao, *args in sess.info.pop('indice_produtos', []):
+        getattr(indice_hortifruti, operacao)(*args)
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_alteracoes(sess):
+    sess.info.pop('indice_produtos', None)
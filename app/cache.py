@@ -0,0 +1,152 @@
+from flask import request, session, make_response
+from flask_login import current_user
+from functools import wraps
+from datetime import date
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import db
+from .models import Produto, Avaria, VersaoDados
+from .lojas import loja_atual_id
+import hashlib
+import os
+import tempfile
+
+# Modelos cujas escritas invalidam as páginas administrativas
+MODELOS_VERSIONADOS = (Produto, Avaria)
+
+def versao_dados(loja_id=None):
+    """Retorna a versão atual dos dados da loja (uma leitura por chave primária)"""
+    loja_id = loja_id or loja_atual_id()
+    registro = db.session.get(VersaoDados, loja_id)
+    if registro is None:
+        try:
+            registro = VersaoDados(loja_id=loja_id, versao=0)
+            db.session.add(registro)
+            db.session.commit()
+        except IntegrityError:
+            # Outro processo criou a linha ao mesmo tempo
+            db.session.rollback()
+            registro = db.session.get(VersaoDados, loja_id)
+    # Sem a linha (ex.: réplica ainda atrasada) a versão é tratada como zero
+    return registro.versao if registro else 0
+
+def _incrementar_versao(executar, lojas=None):
+    stmt = update(VersaoDados).values(versao=VersaoDados.versao + 1)
+    if lojas is not None:
+        stmt = stmt.where(VersaoDados.loja_id.in_(lojas))
+    executar(stmt)
+
+@event.listens_for(Session, 'after_flush')
+def _versionar_flush(sess, flush_context):
+    """Incrementa a versão das lojas afetadas na mesma transação da escrita ORM"""
+    alterados = list(sess.new) + list(sess.dirty) + list(sess.deleted)
+    lojas = {obj.loja_id for obj in alterados if isinstance(obj, MODELOS_VERSIONADOS)}
+    if lojas:
+        _incrementar_versao(sess.connection().execute, lojas)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _versionar_em_massa(orm_execute_state):
+    """Cobre query.update()/query.delete(), que não passam pelo flush"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, MODELOS_VERSIONADOS):
+        # Dentro de uma requisição a operação já está restrita à loja da sessão
+        loja_id = loja_atual_id()
+        _incrementar_versao(orm_execute_state.session.connection().execute,
+                            [loja_id] if loja_id is not None else None)
+
+def calcular_etag():
+    """ETag da requisição atual: rota, filtros, usuário, loja, formato, dia e versão dos dados"""
+    partes = [
+        request.endpoint or '',
+        '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True))),
+        str(current_user.get_id() or ''),
+        # Aparelhos anônimos trocam de loja em /loja: lojas diferentes, ETags diferentes
+        str(loja_atual_id() or ''),
+        # Mesma URL pode responder em formatos diferentes (ex.: /api/registros)
+        request.headers.get('Accept', ''),
+        # Janelas por data ("Hoje", "Esta Semana") mudam à meia-noite sem escrita
+        date.today().isoformat(),
+        str(versao_dados()),
+    ]
+    return hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()
+
+def get_condicional(f):
+    """Responde 304 a If-None-Match antes de executar as consultas da view"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        # Mensagens flash pendentes mudam o HTML: renderizar normalmente
+        if session.get('_flashes'):
+            return f(*args, **kwargs)
+        
+        etag = calcular_etag()
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
+
+class CacheExportacao:
+    """Arquivos de exportação em disco, com despejo LRU limitado por tamanho total"""
+
+    def __init__(self, pasta, max_bytes):
+        self.pasta = pasta
+        self.max_bytes = max_bytes
+        os.makedirs(pasta, exist_ok=True)
+
+    def chave(self, *partes):
+        return hashlib.sha256(repr(partes).encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave)
+
+    def obter(self, chave):
+        """Caminho do arquivo em cache (marcado como usado agora) ou None"""
+        caminho = self._caminho(chave)
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            return None
+        return caminho
+
+    def salvar(self, chave, conteudo):
+        caminho = self._caminho(chave)
+        # Escrita atômica: outro worker nunca lê um arquivo pela metade
+        fd, temporario = tempfile.mkstemp(dir=self.pasta, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+        self._despejar()
+        return caminho
+
+    def _despejar(self):
+        """Remove os arquivos usados há mais tempo até caber no limite"""
+        arquivos = []
+        for entrada in os.scandir(self.pasta):
+            if entrada.is_file() and not entrada.name.startswith('.tmp-'):
+                info = entrada.stat()
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        # O mais recente (o recém-salvo) nunca é removido
+        for _, tamanho, caminho in sorted(arquivos)[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+def init_app(app):
+    app.extensions['cache_exportacao'] = CacheExportacao(
+        app.config['EXPORT_CACHE_DIR'],
+        app.config['EXPORT_CACHE_MAX_MB'] * 1024 * 1024,
+    )
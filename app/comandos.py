@@ -0,0 +1,51 @@
+from . import db
+from .models import Loja
+from .esquema import atualizar_esquema
+import click
+
+@click.command('criar-loja')
+@click.argument('nome')
+def criar_loja(nome):
+    """Cadastra uma nova loja"""
+    if Loja.query.filter_by(nome=nome).first():
+        click.echo(f'❌ A loja "{nome}" já existe.')
+        return
+    loja = Loja(nome=nome)
+    db.session.add(loja)
+    db.session.commit()
+    click.echo(f'✅ Loja "{loja.nome}" criada com id {loja.id}.')
+
+@click.command('sqlite-manutencao')
+@click.option('--vacuum', is_flag=True, help='Também compacta o arquivo (bloqueia escritas enquanto roda).')
+def sqlite_manutencao(vacuum):
+    """Checkpoint do WAL, ANALYZE e (opcional) VACUUM do banco SQLite"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        click.echo('❌ O banco configurado não é SQLite.')
+        return
+    
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        ocupado, paginas_wal, copiadas = conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)').one()
+        click.echo(f'✅ Checkpoint: {copiadas}/{paginas_wal} páginas do WAL copiadas' + (' (leitores ativos)' if ocupado else ''))
+        
+        conn.exec_driver_sql('ANALYZE')
+        click.echo('✅ Estatísticas do planejador atualizadas (ANALYZE)')
+        
+        if vacuum:
+            conn.exec_driver_sql('VACUUM')
+            click.echo('✅ Arquivo compactado (VACUUM)')
+
+@click.command('atualizar-banco')
+def atualizar_banco():
+    """Atualiza o esquema de um banco existente (lojas, atualizado_em, índices)"""
+    alteracoes = atualizar_esquema()
+    if not alteracoes:
+        click.echo('✅ Banco já está atualizado.')
+        return
+    for alteracao in alteracoes:
+        click.echo(f'✅ {alteracao}')
+
+def init_app(app):
+    app.cli.add_command(criar_loja)
+    app.cli.add_command(sqlite_manutencao)
+    app.cli.add_command(atualizar_banco)
@@ -0,0 +1,93 @@
+from datetime import datetime
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import Column, Integer, DateTime, inspect, update, table, column
+from . import db
+from .models import Usuario, Produto, Avaria
+from .lojas import _id_loja_padrao
+
+# Tabelas anteriores às lojas: ganham loja_id preenchido com a loja padrão
+TABELAS_POR_LOJA = ('usuario', 'produto', 'avaria')
+# Dá nome à antiga UNIQUE de codigo_barras, criada sem nome no SQLite
+CONVENCAO_NOMES = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+def _colunas(conn, tabela):
+    return {coluna['name'] for coluna in inspect(conn).get_columns(tabela)}
+
+def _adicionar_loja_id(conn, ops, tabela, loja_id):
+    # Nula primeiro para preencher as linhas existentes, depois NOT NULL com a FK
+    ops.add_column(tabela, Column('loja_id', Integer))
+    conn.execute(update(table(tabela, column('loja_id'))).values(loja_id=loja_id))
+    with ops.batch_alter_table(tabela) as batch:
+        batch.alter_column('loja_id', existing_type=Integer, nullable=False)
+        batch.create_foreign_key(f'fk_{tabela}_loja_id', 'loja', ['loja_id'], ['id'])
+
+def _trocar_unique_codigo_barras(conn, ops):
+    """UNIQUE (codigo_barras) vira UNIQUE (loja_id, codigo_barras); devolve se mudou algo"""
+    insp = inspect(conn)
+    uniques = insp.get_unique_constraints('produto')
+    antigas = [u['name'] for u in uniques if u['column_names'] == ['codigo_barras']]
+    # Só índices UNIQUE avulsos: no PostgreSQL o índice que sustenta a constraint
+    # também aparece aqui e cai junto com o DROP CONSTRAINT
+    indices_antigos = [i['name'] for i in insp.get_indexes('produto')
+                       if i['unique'] and i['column_names'] == ['codigo_barras']
+                       and 'duplicates_constraint' not in i and i['name'] not in antigas]
+    tem_nova = any(u['name'] == 'uq_produto_loja_codigo_barras' for u in uniques)
+    if not antigas and not indices_antigos and tem_nova:
+        return False
+
+    if antigas or not tem_nova:
+        with ops.batch_alter_table('produto', naming_convention=CONVENCAO_NOMES) as batch:
+            for nome in antigas:
+                batch.drop_constraint(nome or 'uq_produto_codigo_barras', type_='unique')
+            if not tem_nova:
+                batch.create_unique_constraint('uq_produto_loja_codigo_barras', ['loja_id', 'codigo_barras'])
+    for nome in indices_antigos:
+        ops.drop_index(nome, table_name='produto')
+    return True
+
+def atualizar_esquema():
+    """Leva um banco criado antes das lojas e de `atualizado_em` ao esquema de app/models.py.
+
+    Cada passo confere o que já existe, então pode rodar a cada deploy. Devolve
+    a lista das alterações feitas (vazia se o banco já estava atualizado).
+    """
+    # Tabelas novas (loja, versao_dados); create_all não altera as existentes
+    db.create_all()
+    alteracoes = []
+
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'sqlite':
+            # A recriação das tabelas no SQLite não pode disparar as FKs
+            conn.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            conn.commit()
+
+        with conn.begin():
+            ops = Operations(MigrationContext.configure(conn))
+            loja_id = _id_loja_padrao(conn.execute)
+
+            for tabela in TABELAS_POR_LOJA:
+                if 'loja_id' not in _colunas(conn, tabela):
+                    _adicionar_loja_id(conn, ops, tabela, loja_id)
+                    alteracoes.append(f'{tabela}.loja_id (loja {loja_id})')
+
+            # Registros antigos: última alteração = data do registro (ou agora)
+            for tabela in ('produto', 'avaria'):
+                if 'atualizado_em' not in _colunas(conn, tabela):
+                    ops.add_column(tabela, Column('atualizado_em', DateTime))
+                    alvo = table(tabela, column('atualizado_em'), column('data_registro'))
+                    valor = alvo.c.data_registro if tabela == 'avaria' else datetime.utcnow()
+                    conn.execute(update(alvo).values(atualizado_em=valor))
+                    alteracoes.append(f'{tabela}.atualizado_em')
+
+            if _trocar_unique_codigo_barras(conn, ops):
+                alteracoes.append('produto: UNIQUE (loja_id, codigo_barras)')
+
+            for modelo in (Usuario, Produto, Avaria):
+                existentes = {i['name'] for i in inspect(conn).get_indexes(modelo.__tablename__)}
+                for indice in modelo.__table__.indexes:
+                    if indice.name not in existentes:
+                        indice.create(conn)
+                        alteracoes.append(f'índice {indice.name}')
+
+    return alteracoes
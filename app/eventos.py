@@ -0,0 +1,129 @@
+from flask import Response, current_app
+from datetime import datetime, date, timedelta, time
+from .models import Avaria
+from .lojas import loja_atual_id
+import json
+import queue
+import threading
+
+# Intervalo dos comentários de keep-alive na conexão SSE
+INTERVALO_PING = 15
+
+class Publicador:
+    """Pub/sub em memória do processo: cada dashboard aberto é uma fila por loja"""
+
+    def __init__(self, max_fila=100):
+        self.max_fila = max_fila
+        self._assinantes = {}
+        self._lock = threading.Lock()
+
+    def assinar(self, loja_id):
+        fila = queue.Queue(self.max_fila)
+        with self._lock:
+            self._assinantes.setdefault(loja_id, set()).add(fila)
+        return fila
+
+    def cancelar(self, loja_id, fila):
+        with self._lock:
+            filas = self._assinantes.get(loja_id)
+            if filas:
+                filas.discard(fila)
+                if not filas:
+                    del self._assinantes[loja_id]
+
+    def tem_assinantes(self, loja_id):
+        return bool(self._assinantes.get(loja_id))
+
+    def publicar(self, loja_id, tipo, dados):
+        with self._lock:
+            filas = list(self._assinantes.get(loja_id, ()))
+        for fila in filas:
+            try:
+                fila.put_nowait((tipo, dados))
+            except queue.Full:
+                # Cliente lento: descarta o atraso e pede um recarregamento completo
+                with fila.mutex:
+                    fila.queue.clear()
+                fila.put_nowait(('recarregar', {}))
+
+publicador = Publicador()
+
+def limites_dashboard():
+    """Início dos cards "Hoje" e "Esta Semana" (hoje e os 6 dias anteriores).
+
+    Os dois começam à meia-noite: só mudam com a data, que faz parte do ETag
+    do dashboard, então uma resposta 304 nunca mostra uma janela vencida.
+    """
+    inicio_hoje = datetime.combine(date.today(), time.min)
+    return inicio_hoje, inicio_hoje - timedelta(days=6)
+
+def contadores_dashboard():
+    """Contadores dos cards do dashboard para a loja atual"""
+    inicio_hoje, inicio_semana = limites_dashboard()
+    return {
+        'total': Avaria.query.count(),
+        # Intervalo em vez de func.date() para usar o índice (loja_id, data_registro)
+        'hoje': Avaria.query.filter(Avaria.data_registro >= inicio_hoje).count(),
+        'semana': Avaria.query.filter(Avaria.data_registro >= inicio_semana).count(),
+    }
+
+def variacao_contadores(data_registro, sinal):
+    """Quanto um registro com essa data soma (sinal=1) ou tira (sinal=-1) de cada card"""
+    inicio_hoje, inicio_semana = limites_dashboard()
+    return {
+        'total': sinal,
+        'hoje': sinal if data_registro >= inicio_hoje else 0,
+        'semana': sinal if data_registro >= inicio_semana else 0,
+    }
+
+def publicar_avaria(tipo, avaria_id, produto=None, data_anterior=None, **campos):
+    """Hook das rotas de registro/edição/exclusão: avisa os dashboards conectados.
+
+    Os contadores vão como variação (o cliente soma ao valor exibido), sem
+    consultas ao banco por registro: `data_registro` é a data que entra nos
+    cards e `data_anterior` a que sai (edição de data e exclusão).
+    """
+    loja_id = loja_atual_id()
+    if not current_app.config['DASHBOARD_TEMPO_REAL'] or not publicador.tem_assinantes(loja_id):
+        return
+
+    variacao = {'total': 0, 'hoje': 0, 'semana': 0}
+    data_registro = campos.get('data_registro')
+    for data, sinal in ((data_registro, 1), (data_anterior, -1)):
+        if data is not None:
+            for card, valor in variacao_contadores(data, sinal).items():
+                variacao[card] += valor
+
+    dados = {'avaria': {'id': avaria_id}, 'variacao': variacao}
+    if produto is not None:
+        dados['avaria'].update({
+            'produto_nome': produto.nome,
+            'produto_tipo': produto.tipo,
+            'peso': campos.get('peso'),
+            'quantidade': campos.get('quantidade'),
+            'data': data_registro.strftime('%d/%m %H:%M') if data_registro else None,
+        })
+    publicador.publicar(loja_id, tipo, dados)
+
+def resposta_sse(loja_id):
+    """Resposta text/event-stream que repassa os eventos da loja até o cliente desconectar"""
+    fila = publicador.assinar(loja_id)
+
+    def gerar():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    tipo, dados = fila.get(timeout=INTERVALO_PING)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield f'event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n'
+        finally:
+            publicador.cancelar(loja_id, fila)
+
+    return Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Evita que proxies (nginx) segurem os eventos em buffer
+        'X-Accel-Buffering': 'no',
+    })
@@ -0,0 +1,146 @@
+from flask import current_app
+from datetime import datetime
+from . import db
+from .models import Avaria
+from .lojas import loja_atual_id
+import os
+import queue
+import threading
+import time
+
+class _Pedido:
+    """Uma avaria aguardando o commit do seu lote"""
+    __slots__ = ('campos', 'estado', 'concluido', 'avaria_id', 'erro')
+
+    def __init__(self, campos):
+        self.campos = campos
+        # 'pendente' -> 'gravando' (pego por um lote) ou 'cancelado' (tempo esgotado)
+        self.estado = 'pendente'
+        self.concluido = threading.Event()
+        self.avaria_id = None
+        self.erro = None
+
+class BufferIngestao:
+    """Agrupa registros de avaria em lotes gravados por uma thread em segundo plano.
+
+    O lote é gravado a cada `intervalo_ms` ou assim que acumula `max_itens`,
+    em uma única transação. Quem registra só recebe a resposta depois do commit
+    do lote, então a durabilidade é a mesma do caminho direto. Se o tempo de
+    espera esgota antes de o lote pegar o registro, ele é cancelado e nunca é
+    gravado, então o operador pode reenviar sem duplicar.
+    """
+
+    def __init__(self, app, intervalo_ms=20, max_itens=100, timeout=10):
+        self.app = app
+        self.intervalo = intervalo_ms / 1000
+        self.max_itens = max_itens
+        self.timeout = timeout
+        self.fila = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._lock_pedidos = threading.Lock()
+
+    def _garantir_thread(self):
+        # Iniciada sob demanda (e reiniciada após fork, ex.: gunicorn --preload)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self.fila = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._executar, name='ingestao-avarias', daemon=True)
+                self._thread.start()
+
+    def registrar(self, campos):
+        """Enfileira a avaria e bloqueia até o commit do lote; retorna o id gravado"""
+        self._garantir_thread()
+        pedido = _Pedido(campos)
+        self.fila.put(pedido)
+        if not pedido.concluido.wait(self.timeout):
+            with self._lock_pedidos:
+                cancelado = pedido.estado == 'pendente'
+                if cancelado:
+                    pedido.estado = 'cancelado'
+            if cancelado:
+                raise TimeoutError('Tempo esgotado aguardando a gravação do registro.')
+            # Já está no lote em gravação: o resultado é definitivo, então espera o commit
+            pedido.concluido.wait()
+        if pedido.erro is not None:
+            raise pedido.erro
+        return pedido.avaria_id
+
+    def _executar(self):
+        with self.app.app_context():
+            while True:
+                lote = [self.fila.get()]
+                prazo = time.monotonic() + self.intervalo
+                while len(lote) < self.max_itens:
+                    restante = prazo - time.monotonic()
+                    if restante <= 0:
+                        break
+                    try:
+                        lote.append(self.fila.get(timeout=restante))
+                    except queue.Empty:
+                        break
+                with self._lock_pedidos:
+                    lote = [pedido for pedido in lote if pedido.estado == 'pendente']
+                    for pedido in lote:
+                        pedido.estado = 'gravando'
+                if lote:
+                    self._gravar(lote)
+
+    def _gravar(self, lote):
+        try:
+            try:
+                self._commit(lote)
+            except Exception:
+                db.session.rollback()
+                # Um registro inválido não derruba o lote: regrava um a um
+                for pedido in lote:
+                    try:
+                        self._commit([pedido])
+                    except Exception as e:
+                        db.session.rollback()
+                        pedido.erro = e
+        finally:
+            db.session.remove()
+            for pedido in lote:
+                pedido.concluido.set()
+
+    def _commit(self, lote):
+        avarias = [Avaria(**pedido.campos) for pedido in lote]
+        db.session.add_all(avarias)
+        db.session.flush()
+        ids = [avaria.id for avaria in avarias]
+        db.session.commit()
+        for pedido, avaria_id in zip(lote, ids):
+            pedido.avaria_id = avaria_id
+
+def registrar_avaria(**campos):
+    """Grava uma avaria diretamente ou pelo buffer de ingestão, conforme a configuração"""
+    buffer = current_app.extensions.get('ingestao')
+    if buffer is None:
+        avaria = Avaria(**campos)
+        db.session.add(avaria)
+        db.session.flush()
+        avaria_id = avaria.id
+        db.session.commit()
+        return avaria_id
+
+    # A thread de gravação não tem requisição: loja e horário vão explícitos
+    campos.setdefault('loja_id', loja_atual_id())
+    campos.setdefault('data_registro', datetime.utcnow())
+    
+    # Devolve a conexão da requisição ao pool antes de esperar o lote; com muitas
+    # requisições aguardando, a thread de gravação ficaria sem conexão disponível
+    db.session.commit()
+    return buffer.registrar(campos)
+
+def init_app(app):
+    if app.config['INGESTAO_EM_LOTE']:
+        app.extensions['ingestao'] = BufferIngestao(
+            app,
+            intervalo_ms=app.config['INGESTAO_INTERVALO_MS'],
+            max_itens=app.config['INGESTAO_MAX_ITENS'],
+        )
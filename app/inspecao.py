@@ -0,0 +1,135 @@
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from functools import wraps
+from collections import Counter
+from sqlalchemy import event
+import os
+import re
+import sys
+import time
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+class ConsultasExcedidas(Exception):
+    """Rota executou mais consultas que o orçamento declarado (modo estrito)"""
+
+# Literais e listas de parâmetros viram "?" para agrupar consultas de mesmo formato
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETRO = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+|\?')
+_LISTA = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ESPACOS = re.compile(r'\s+')
+
+def normalizar(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _PARAMETRO.sub('?', sql)
+    sql = _NUMERO.sub('?', sql)
+    sql = _LISTA.sub('(?)', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+def _origem():
+    """Primeira linha de código da aplicação (fora deste módulo) na pilha atual"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        # Templates são identificados pelos sinais de renderização, não pela pilha
+        if arquivo.startswith(PASTA_APP) and arquivo.endswith('.py') and arquivo != __file__:
+            return f'{os.path.relpath(arquivo, os.path.dirname(PASTA_APP))}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+def orcamento_consultas(maximo):
+    """Declara quantas consultas a rota pode executar por requisição.
+
+    Com a inspeção ligada, estourar o orçamento gera um aviso no log; no modo
+    estrito (testes) levanta ConsultasExcedidas.
+    """
+    def decorador(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            g.orcamento_consultas = maximo
+            return f(*args, **kwargs)
+        return wrapper
+    return decorador
+
+def _registrar_inicio(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'consultas' in g:
+        conn.info.setdefault('inspecao_inicio', []).append(time.perf_counter())
+
+def _registrar_fim(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('inspecao_inicio')
+    if not inicios or not has_request_context() or 'consultas' not in g:
+        return
+    g.consultas.append({
+        'formato': normalizar(statement),
+        'duracao': time.perf_counter() - inicios.pop(),
+        'template': g.templates[-1] if g.templates else None,
+        'origem': _origem(),
+    })
+
+def _antes_template(sender, template, context, **extra):
+    if 'templates' in g:
+        g.templates.append(template.name)
+
+def _depois_template(sender, template, context, **extra):
+    if g.get('templates'):
+        g.templates.pop()
+
+def relatorio(consultas, limite):
+    """Formatos executados mais de `limite` vezes, com o template e as linhas de origem"""
+    contagem = Counter(c['formato'] for c in consultas)
+    repetidas = []
+    for formato, vezes in contagem.most_common():
+        if vezes <= limite:
+            break
+        ocorrencias = [c for c in consultas if c['formato'] == formato]
+        repetidas.append({
+            'formato': formato,
+            'vezes': vezes,
+            'duracao_ms': round(sum(c['duracao'] for c in ocorrencias) * 1000, 2),
+            'templates': sorted({c['template'] for c in ocorrencias if c['template']}),
+            'origens': [origem for origem, _ in Counter(c['origem'] for c in ocorrencias if c['origem']).most_common(3)],
+        })
+    return repetidas
+
+def init_app(app, db):
+    """Liga a inspeção de consultas por requisição (desenvolvimento e testes)"""
+    if not app.config['INSPECAO_CONSULTAS']:
+        return
+    limite = app.config['INSPECAO_LIMITE_REPETICOES']
+    estrito = app.config['INSPECAO_ESTRITA']
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _registrar_inicio)
+            event.listen(engine, 'after_cursor_execute', _registrar_fim)
+    before_render_template.connect(_antes_template, app)
+    template_rendered.connect(_depois_template, app)
+
+    @app.before_request
+    def iniciar_inspecao():
+        g.consultas = []
+        g.templates = []
+
+    @app.after_request
+    def avaliar_consultas(response):
+        consultas = g.pop('consultas', None)
+        if consultas is None:
+            return response
+        total_ms = sum(c['duracao'] for c in consultas) * 1000
+        response.headers['X-Consultas'] = str(len(consultas))
+        response.headers.add('Server-Timing', f'db;dur={total_ms:.1f};desc="{len(consultas)} consultas"')
+
+        for item in relatorio(consultas, limite):
+            app.logger.warning(
+                'Consulta repetida %dx (%.1f ms) em %s [template: %s] [origem: %s]: %s',
+                item['vezes'], item['duracao_ms'], request.endpoint,
+                ', '.join(item['templates']) or '-', ', '.join(item['origens']) or '-', item['formato'],
+            )
+
+        orcamento = g.get('orcamento_consultas')
+        if orcamento is not None and len(consultas) > orcamento:
+            mensagem = f'{request.endpoint} executou {len(consultas)} consultas (orçamento: {orcamento})'
+            if estrito:
+                raise ConsultasExcedidas(mensagem)
+            app.logger.warning(mensagem)
+        return response
@@ -0,0 +1,75 @@
+from flask import g, session, has_request_context
+from flask_login import current_user
+from sqlalchemy import event, select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, with_loader_criteria
+from .models import Loja, Usuario, Produto, Avaria
+
+# Modelos particionados por loja: toda consulta ORM é filtrada pela loja da sessão
+MODELOS_POR_LOJA = (Usuario, Produto, Avaria)
+
+NOME_LOJA_PADRAO = 'Loja Principal'
+
+def loja_atual_id():
+    """Loja da requisição atual (None fora de requisições, ex.: scripts e CLI)"""
+    if not has_request_context():
+        return None
+    return g.get('loja_id')
+
+def selecionar_loja(loja_id):
+    """Fixa a loja da sessão do navegador (e da requisição em andamento)"""
+    session['loja_id'] = loja_id
+    g.loja_id = loja_id
+
+def _id_loja_padrao(executar):
+    """Primeira loja cadastrada; cria a loja padrão se o banco ainda não tiver nenhuma"""
+    loja_id = executar(select(Loja.id).order_by(Loja.id).limit(1)).scalar()
+    if loja_id is None:
+        loja_id = executar(insert(Loja).values(nome=NOME_LOJA_PADRAO)).inserted_primary_key[0]
+    return loja_id
+
+def carregar_loja_da_sessao(db):
+    """before_request: resolve a loja a partir da sessão, com a loja padrão como fallback"""
+    if current_user.is_authenticated:
+        # Usuário logado (inclusive via cookie "lembrar-me", sem sessão): loja da conta
+        loja_id = current_user.loja_id
+        if session.get('loja_id') != loja_id:
+            session['loja_id'] = loja_id
+        g.loja_id = loja_id
+        return
+    loja_id = session.get('loja_id')
+    if loja_id is None:
+        try:
+            loja_id = _id_loja_padrao(db.session.execute)
+            db.session.commit()
+        except IntegrityError:
+            # Outra requisição criou a loja padrão ao mesmo tempo
+            db.session.rollback()
+            loja_id = _id_loja_padrao(db.session.execute)
+        session['loja_id'] = loja_id
+    g.loja_id = loja_id
+
+@event.listens_for(Session, 'do_orm_execute')
+def _filtrar_por_loja(orm_execute_state):
+    """Adiciona loja_id = <loja da sessão> a SELECT/UPDATE/DELETE dos modelos particionados"""
+    if orm_execute_state.is_insert or orm_execute_state.execution_options.get('todas_lojas'):
+        return
+    loja_id = loja_atual_id()
+    if loja_id is None:
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(*[
+        with_loader_criteria(modelo, lambda cls: cls.loja_id == loja_id, include_aliases=True)
+        for modelo in MODELOS_POR_LOJA
+    ])
+
+@event.listens_for(Session, 'before_flush')
+def _atribuir_loja(sess, flush_context, instances):
+    """Novos registros herdam a loja da sessão (ou a loja padrão fora de requisições)"""
+    novos = [obj for obj in sess.new if isinstance(obj, MODELOS_POR_LOJA) and obj.loja_id is None]
+    if not novos:
+        return
+    loja_id = loja_atual_id()
+    if loja_id is None:
+        loja_id = _id_loja_padrao(sess.connection().execute)
+    for obj in novos:
+        obj.loja_id = loja_id
@@ -3,8 +3,16 @@ from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
+class Loja(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    
+    def __repr__(self):
+        return f'<Loja {self.nome}>'
+
 class Usuario(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    loja_id = db.Column(db.Integer, db.ForeignKey('loja.id'), nullable=False, index=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
@@ -21,19 +29,39 @@ class Usuario(UserMixin, db.Model):
         return f'<Usuario {self.username}>'
 
 class Produto(db.Model):
+    __table_args__ = (
+        # Código de barras é único dentro de cada loja
+        db.UniqueConstraint('loja_id', 'codigo_barras', name='uq_produto_loja_codigo_barras'),
+        db.Index('ix_produto_loja_tipo_nome', 'loja_id', 'tipo', 'nome'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    loja_id = db.Column(db.Integer, db.ForeignKey('loja.id'), nullable=False)
     nome = db.Column(db.String(100), nullable=False)
-    codigo_barras = db.Column(db.String(50), unique=True, nullable=True)
+    codigo_barras = db.Column(db.String(50), nullable=True)
     tipo = db.Column(db.String(50), nullable=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     avarias = db.relationship('Avaria', backref='produto', lazy=True, cascade='all, delete-orphan')
 
 class Avaria(db.Model):
+    __table_args__ = (
+        db.Index('ix_avaria_loja_data', 'loja_id', 'data_registro'),
+        db.Index('ix_avaria_loja_produto', 'loja_id', 'produto_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
+    loja_id = db.Column(db.Integer, db.ForeignKey('loja.id'), nullable=False)
     produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False)
     peso = db.Column(db.Float, nullable=True)
     quantidade = db.Column(db.Integer, nullable=True)
     observacoes = db.Column(db.Text, nullable=True)
     data_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Avaria {self.id} - Produto {self.produto_id}>'
+
+class VersaoDados(db.Model):
+    """Marca d'água dos dados da loja: incrementada a cada escrita em Produto ou Avaria"""
+    loja_id = db.Column(db.Integer, db.ForeignKey('loja.id'), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,33 @@
+from sqlalchemy import event
+
+def pragmas(config):
+    """PRAGMAs de produção para o fallback SQLite, na ordem em que são aplicados"""
+    return [
+        # WAL: leitores não bloqueiam o escritor e vice-versa
+        ('journal_mode', 'WAL'),
+        # Em WAL, NORMAL só perde as últimas transações numa queda de energia
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        # Valor negativo = tamanho em KiB
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),
+        ('temp_store', 'MEMORY'),
+    ]
+
+def aplicar_pragmas(dbapi_conn, lista):
+    cursor = dbapi_conn.cursor()
+    try:
+        for nome, valor in lista:
+            cursor.execute(f'PRAGMA {nome}={valor}')
+    finally:
+        cursor.close()
+
+def init_app(app, db):
+    """Aplica o perfil a cada nova conexão dos engines SQLite"""
+    if not app.config['SQLITE_PERFIL_PRODUCAO']:
+        return
+    lista = pragmas(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', lambda dbapi_conn, _: aplicar_pragmas(dbapi_conn, lista))
@@ -0,0 +1,50 @@
+from flask import g, session, current_app, has_request_context
+from flask_sqlalchemy.session import Session
+from functools import wraps
+from sqlalchemy import event
+import time
+
+BIND_REPLICA = 'replica'
+
+def usar_replica():
+    """A requisição atual pode ler da réplica?"""
+    if not has_request_context() or not g.get('usar_replica'):
+        return False
+    # Leia-suas-escritas: após uma escrita a sessão fica presa ao primário por alguns segundos
+    return session.get('primario_ate', 0) < time.time()
+
+class SessionRoteada(Session):
+    """Envia SELECTs de views somente leitura para a réplica e todo o resto ao primário"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and clause is not None and getattr(clause, 'is_select', False)
+                and BIND_REPLICA in self._db.engines and usar_replica()):
+            return self._db.engines[BIND_REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def somente_leitura(f):
+    """Marca a view como elegível para leitura na réplica"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.usar_replica = True
+        return f(*args, **kwargs)
+    return wrapper
+
+@event.listens_for(SessionRoteada, 'after_flush')
+def _marcar_escrita(sess, flush_context):
+    sess.info['escreveu'] = True
+
+@event.listens_for(SessionRoteada, 'do_orm_execute')
+def _marcar_escrita_em_massa(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info['escreveu'] = True
+
+@event.listens_for(SessionRoteada, 'after_commit')
+def _fixar_no_primario(sess):
+    if sess.info.pop('escreveu', False) and has_request_context():
+        session['primario_ate'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+@event.listens_for(SessionRoteada, 'after_rollback')
+def _descartar_escrita(sess):
+    sess.info.pop('escreveu', None)
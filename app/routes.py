@@ -1,20 +1,78 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, Response, make_response
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, Response, make_response, current_app, send_file
 from flask_login import login_required, current_user
 from . import db
-from .models import Produto, Avaria, Usuario
+from .models import Produto, Avaria, Usuario, Loja
+from .lojas import selecionar_loja, loja_atual_id
+from .cache import get_condicional
+from .replica import somente_leitura
+from .ingestao import registrar_avaria
+from .eventos import contadores_dashboard, publicar_avaria, resposta_sse
+from .busca import indice_hortifruti
+from .analise import resumo_analitico
+from .inspecao import orcamento_consultas
+from .serializacao import registros_colunares, formatos_oferecidos, negociar, codificar
 from datetime import datetime, timedelta
 from sqlalchemy import func, desc
 import csv
+import time
 import io
 import json
 
 bp = Blueprint('main', __name__)
 
+# Produtos devolvidos por busca de destino da reatribuição em massa
+LIMITE_BUSCA_PRODUTOS = 20
+
 # Página inicial
 @bp.route('/')
 def index():
     return render_template('index.html')
 
+# URLs externas pré-cacheadas pelo service worker
+CDN_PRECACHE = [
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+]
+
+# Service worker gerado a partir dos hashes dos arquivos estáticos
+@bp.route('/sw.js')
+def service_worker():
+    assets = current_app.extensions['assets']
+    urls_precache = [
+        url_for('main.index'),
+        url_for('main.registro_hortifruti'),
+        url_for('main.registro_interno'),
+    ]
+    urls_precache += [url_for('static', filename=nome) for nome in sorted(assets['hashes'])]
+    urls_precache += CDN_PRECACHE
+    
+    response = make_response(render_template('sw.js', versao=assets['versao'], urls_precache=urls_precache))
+    response.headers['Content-Type'] = 'application/javascript; charset=utf-8'
+    # O navegador deve sempre revalidar o worker para detectar novas versões
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Escolha da loja do aparelho (scanners não fazem login)
+@bp.route('/loja', methods=['GET', 'POST'])
+def escolher_loja():
+    if request.method == 'POST':
+        if current_user.is_authenticated:
+            flash('Usuários logados operam sempre na loja da sua conta.', 'error')
+            return redirect(url_for('main.escolher_loja'))
+        
+        loja = db.session.get(Loja, request.form.get('loja_id', type=int))
+        if not loja:
+            flash('Loja não encontrada.', 'error')
+            return redirect(url_for('main.escolher_loja'))
+        
+        selecionar_loja(loja.id)
+        flash(f'Aparelho vinculado à loja {loja.nome}.', 'success')
+        return redirect(url_for('main.index'))
+    
+    lojas = Loja.query.order_by(Loja.nome).all()
+    return render_template('loja.html', lojas=lojas)
+
 # Registro de avaria hortifruti
 @bp.route('/registrar/hortifruti', methods=['GET', 'POST'])
 def registro_hortifruti():
@@ -27,17 +85,21 @@ def registro_hortifruti():
                 flash('Por favor, preencha todos os campos obrigatórios.', 'error')
                 return render_template('registro_hortifruti.html')
             
-            # Buscar ou criar o produto
-            produto = Produto.query.filter_by(nome=nome_produto, tipo='hortifruti').first()
+            # Buscar ou criar o produto: "Tomate", "tomate " e "Tomáte" são o mesmo
+            nome_produto = ' '.join(nome_produto.split())
+            produto_id = indice_hortifruti.buscar(loja_atual_id(), nome_produto)
+            produto = db.session.get(Produto, produto_id) if produto_id else None
+            if not produto:
+                produto = Produto.query.filter_by(nome=nome_produto, tipo='hortifruti').first()
             if not produto:
                 produto = Produto(nome=nome_produto, tipo='hortifruti')
                 db.session.add(produto)
                 db.session.commit()
             
             # Criar registro de avaria
-            avaria = Avaria(produto_id=produto.id, peso=peso)
-            db.session.add(avaria)
-            db.session.commit()
+            data_registro = datetime.utcnow()
+            avaria_id = registrar_avaria(produto_id=produto.id, peso=peso, data_registro=data_registro)
+            publicar_avaria('avaria_criada', avaria_id, produto, peso=peso, data_registro=data_registro)
             
             flash(f'Avaria registrada com sucesso! Produto: {nome_produto}, Peso: {peso}kg', 'success')
             return redirect(url_for('main.index'))
@@ -48,6 +110,30 @@ def registro_hortifruti():
     
     return render_template('registro_hortifruti.html')
 
+# Sugestões de nomes para o registro de hortifrúti (typeahead)
+@bp.route('/api/produtos/sugestoes')
+def sugestoes_produtos():
+    inicio = time.perf_counter()
+    sugestoes = indice_hortifruti.sugerir(loja_atual_id(), request.args.get('q', ''))
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    
+    response = jsonify(sugestoes)
+    response.headers['Server-Timing'] = f'indice;dur={duracao_ms:.3f}'
+    return response
+
+# Produtos de destino da reatribuição em massa (buscados enquanto o admin digita)
+@bp.route('/api/produtos/busca')
+@login_required
+@somente_leitura
+def buscar_produtos():
+    termo = request.args.get('q', '').strip()
+    if not termo:
+        return jsonify([])
+    produtos = db.session.query(Produto.id, Produto.nome, Produto.tipo).filter(
+        Produto.nome.icontains(termo, autoescape=True) | (Produto.codigo_barras == termo)
+    ).order_by(Produto.nome).limit(LIMITE_BUSCA_PRODUTOS).all()
+    return jsonify([{'id': p.id, 'nome': p.nome, 'tipo': p.tipo} for p in produtos])
+
 # Registro de avaria uso interno
 @bp.route('/registrar/interno', methods=['GET', 'POST'])
 def registro_interno():
@@ -74,9 +160,9 @@ def registro_interno():
                     db.session.commit()
             
             # Criar registro de avaria
-            avaria = Avaria(produto_id=produto.id, quantidade=quantidade)
-            db.session.add(avaria)
-            db.session.commit()
+            data_registro = datetime.utcnow()
+            avaria_id = registrar_avaria(produto_id=produto.id, quantidade=quantidade, data_registro=data_registro)
+            publicar_avaria('avaria_criada', avaria_id, produto, quantidade=quantidade, data_registro=data_registro)
             
             flash(f'Avaria registrada com sucesso! Produto: {nome_produto}, Código: {codigo_barras}, Quantidade: {quantidade}', 'success')
             return redirect(url_for('main.index'))
@@ -91,17 +177,13 @@ def registro_interno():
 
 @bp.route('/admin')
 @login_required
+@somente_leitura
+@get_condicional
 def admin_dashboard():
     """Painel administrativo principal"""
     try:
         # Estatísticas gerais
-        total_registros = Avaria.query.count()
-        registros_hoje = Avaria.query.filter(
-            func.date(Avaria.data_registro) == datetime.now().date()
-        ).count()
-        registros_semana = Avaria.query.filter(
-            Avaria.data_registro >= datetime.now() - timedelta(days=7)
-        ).count()
+        contadores = contadores_dashboard()
         
         # Produtos mais registrados
         produtos_mais_registrados = db.session.query(
@@ -116,45 +198,38 @@ def admin_dashboard():
         registros_recentes = db.session.query(Avaria, Produto).join(Produto).order_by(desc(Avaria.data_registro)).limit(20).all()
         
         stats = {
-            'total_registros': total_registros,
-            'registros_hoje': registros_hoje,
-            'registros_semana': registros_semana,
+            'total_registros': contadores['total'],
+            'registros_hoje': contadores['hoje'],
+            'registros_semana': contadores['semana'],
             'produtos_mais_registrados': produtos_mais_registrados,
             'registros_recentes': registros_recentes
         }
         
-        return render_template('admin/dashboard.html', stats=stats)
+        return render_template('admin/dashboard.html', stats=stats,
+                             tempo_real=current_app.config['DASHBOARD_TEMPO_REAL'])
         
     except Exception as e:
         flash(f'Erro ao carregar dashboard: {str(e)}', 'error')
         return redirect(url_for('main.index'))
 
+@bp.route('/admin/eventos')
+@login_required
+def admin_eventos():
+    """Feed SSE do dashboard: avarias registradas, editadas e excluídas"""
+    if not current_app.config['DASHBOARD_TEMPO_REAL']:
+        return Response(status=204)
+    return resposta_sse(loja_atual_id())
+
 @bp.route('/admin/registros')
 @login_required
+@somente_leitura
+@get_condicional
 def admin_registros():
     """Visualização detalhada de todos os registros"""
     try:
         # Filtros
-        tipo_filtro = request.args.get('tipo', 'todos')
-        data_inicio = request.args.get('data_inicio')
-        data_fim = request.args.get('data_fim')
-        produto_filtro = request.args.get('produto', '')
-        
-        # Query base
-        query = db.session.query(Avaria, Produto).join(Produto)
-        
-        # Aplicar filtros
-        if tipo_filtro != 'todos':
-            query = query.filter(Produto.tipo == tipo_filtro)
-        
-        if data_inicio:
-            query = query.filter(Avaria.data_registro >= datetime.strptime(data_inicio, '%Y-%m-%d'))
-        
-        if data_fim:
-            query = query.filter(Avaria.data_registro <= datetime.strptime(data_fim + ' 23:59:59', '%Y-%m-%d %H:%M:%S'))
-        
-        if produto_filtro:
-            query = query.filter(Produto.nome.ilike(f'%{produto_filtro}%'))
+        filtros = ler_filtros()
+        query = aplicar_filtros(db.session.query(Avaria, Produto).join(Produto), filtros)
         
         # Paginação
         page = request.args.get('page', 1, type=int)
@@ -171,75 +246,135 @@ def admin_registros():
         return render_template('admin/registros.html', 
                              registros=registros,
                              produtos_lista=produtos_lista,
-                             filtros={
-                                 'tipo': tipo_filtro,
-                                 'data_inicio': data_inicio,
-                                 'data_fim': data_fim,
-                                 'produto': produto_filtro
-                             })
+                             filtros=filtros,
+                             args_paginacao={k: v for k, v in request.args.items() if k != 'page'})
         
     except Exception as e:
         flash(f'Erro ao carregar registros: {str(e)}', 'error')
         return redirect(url_for('main.admin_dashboard'))
 
+# API compacta dos registros para o PWA (mesmos filtros da listagem)
+@bp.route('/api/registros')
+@login_required
+@somente_leitura
+@get_condicional
+def api_registros():
+    """Registros paginados em colunas, JSON ou MessagePack conforme o Accept"""
+    mimetype = negociar(request.accept_mimetypes)
+    if mimetype is None:
+        return jsonify({'erro': 'Formato não suportado', 'formatos': list(formatos_oferecidos())}), 406
+    
+    filtros = ler_filtros()
+    try:
+        query = aplicar_filtros(db.session.query(Avaria, Produto).join(Produto), filtros)
+    except ValueError:
+        # Datas fora do formato AAAA-MM-DD
+        return jsonify({'erro': 'Filtro de data inválido', 'formato_data': 'AAAA-MM-DD'}), 400
+
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 200, type=int), 1000)
+    pagina = query.order_by(desc(Avaria.data_registro), desc(Avaria.id)).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    
+    registros, produtos = registros_colunares(pagina.items)
+    response = codificar({
+        'pagina': pagina.page,
+        'paginas': pagina.pages,
+        'total': pagina.total,
+        'registros': registros,
+        'produtos': produtos,
+    }, mimetype)
+    response.vary.add('Accept')
+    return response
+
+def ler_filtros():
+    """Filtros de registros a partir da query string, já normalizados"""
+    return {
+        'tipo': request.args.get('tipo', 'todos') or 'todos',
+        'data_inicio': request.args.get('data_inicio') or None,
+        'data_fim': request.args.get('data_fim') or None,
+        'produto': request.args.get('produto', '').strip()
+    }
+
+def aplicar_filtros(query, filtros):
+    """Aplica os filtros de registros a uma query que já envolve Avaria e Produto"""
+    if filtros['tipo'] != 'todos':
+        query = query.filter(Produto.tipo == filtros['tipo'])
+    
+    if filtros['data_inicio']:
+        query = query.filter(Avaria.data_registro >= datetime.strptime(filtros['data_inicio'], '%Y-%m-%d'))
+    
+    if filtros['data_fim']:
+        query = query.filter(Avaria.data_registro <= datetime.strptime(filtros['data_fim'] + ' 23:59:59', '%Y-%m-%d %H:%M:%S'))
+    
+    if filtros['produto']:
+        query = query.filter(Produto.nome.ilike(f"%{filtros['produto']}%"))
+    
+    return query
+
 @bp.route('/admin/exportar/<formato>')
+@somente_leitura
 def admin_exportar(formato):
     """Exportar dados em diferentes formatos"""
     try:
-        # Filtros (mesma lógica da visualização)
-        tipo_filtro = request.args.get('tipo', 'todos')
-        data_inicio = request.args.get('data_inicio')
-        data_fim = request.args.get('data_fim')
-        produto_filtro = request.args.get('produto', '')
-        
-        # Query base
-        query = db.session.query(Avaria, Produto).join(Produto)
-        
-        # Aplicar filtros
-        if tipo_filtro != 'todos':
-            query = query.filter(Produto.tipo == tipo_filtro)
-        
-        if data_inicio:
-            query = query.filter(Avaria.data_registro >= datetime.strptime(data_inicio, '%Y-%m-%d'))
-        
-        if data_fim:
-            query = query.filter(Avaria.data_registro <= datetime.strptime(data_fim + ' 23:59:59', '%Y-%m-%d %H:%M:%S'))
-        
-        if produto_filtro:
-            query = query.filter(Produto.nome.ilike(f'%{produto_filtro}%'))
-        
-        registros = query.order_by(desc(Avaria.data_registro)).all()
-        
-        # Preparar dados para exportação
-        dados = []
-        for avaria, produto in registros:
-            dados.append({
-                'id': avaria.id,
-                'produto_nome': produto.nome,
-                'produto_tipo': produto.tipo,
-                'codigo_barras': produto.codigo_barras or '',
-                'peso': avaria.peso or '',
-                'quantidade': avaria.quantidade or '',
-                'data_registro': avaria.data_registro.strftime('%d/%m/%Y %H:%M:%S')
-            })
-        
-        # Gerar arquivo baseado no formato
-        if formato == 'csv':
-            return exportar_csv(dados)
-        elif formato == 'txt':
-            return exportar_txt(dados)
-        elif formato == 'json':
-            return exportar_json(dados)
-        else:
+        if formato not in FORMATOS_EXPORTACAO:
             flash('Formato de exportação não suportado.', 'error')
             return redirect(url_for('main.admin_registros'))
+        
+        # Filtros (mesma lógica da visualização)
+        filtros = ler_filtros()
+        
+        # Marca d'água do intervalo: muda com inserções, edições e exclusões que
+        # afetam os registros filtrados (ou os produtos deles)
+        marca = aplicar_filtros(db.session.query(
+            func.count(Avaria.id),
+            func.max(Avaria.id),
+            func.max(Avaria.atualizado_em),
+            func.max(Produto.atualizado_em)
+        ).select_from(Avaria).join(Produto), filtros).one()
+        
+        cache = current_app.extensions['cache_exportacao']
+        chave = cache.chave(formato, loja_atual_id(), sorted(filtros.items()), tuple(marca))
+        caminho = cache.obter(chave)
+        
+        if caminho is None:
+            query = aplicar_filtros(db.session.query(Avaria, Produto).join(Produto), filtros)
+            registros = query.order_by(desc(Avaria.data_registro)).all()
+            
+            # Preparar dados para exportação
+            dados = []
+            for avaria, produto in registros:
+                dados.append({
+                    'id': avaria.id,
+                    'produto_nome': produto.nome,
+                    'produto_tipo': produto.tipo,
+                    'codigo_barras': produto.codigo_barras or '',
+                    'peso': avaria.peso or '',
+                    'quantidade': avaria.quantidade or '',
+                    'data_registro': avaria.data_registro.strftime('%d/%m/%Y %H:%M:%S')
+                })
+            
+            # O arquivo é reaproveitado enquanto a marca d'água não muda: o cabeçalho
+            # traz a última alteração dos dados, não o horário da geração
+            atualizado_em = max(filter(None, marca[2:]), default=None)
+            gerar, _ = FORMATOS_EXPORTACAO[formato]
+            caminho = cache.salvar(chave, gerar(dados, atualizado_em).encode('utf-8'))
+        
+        _, content_type = FORMATOS_EXPORTACAO[formato]
+        return send_file(
+            caminho,
+            mimetype=content_type,
+            as_attachment=True,
+            download_name=f'avarias_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{formato}'
+        )
             
     except Exception as e:
         flash(f'Erro ao exportar dados: {str(e)}', 'error')
         return redirect(url_for('main.admin_registros'))
 
-def exportar_csv(dados):
-    """Exportar dados para CSV"""
+def exportar_csv(dados, atualizado_em=None):
+    """Conteúdo CSV da exportação"""
     output = io.StringIO()
     writer = csv.DictWriter(output, fieldnames=[
         'id', 'produto_nome', 'produto_tipo', 'codigo_barras', 
@@ -250,20 +385,15 @@ def exportar_csv(dados):
     for row in dados:
         writer.writerow(row)
     
-    output.seek(0)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename=avarias_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-    
-    return response
+    return output.getvalue()
 
-def exportar_txt(dados):
-    """Exportar dados para TXT"""
+def exportar_txt(dados, atualizado_em=None):
+    """Conteúdo TXT da exportação"""
     output = io.StringIO()
     
     output.write("=== RELATÓRIO DE AVARIAS ===\n")
-    output.write(f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+    if atualizado_em:
+        output.write(f"Dados atualizados em: {atualizado_em.strftime('%d/%m/%Y %H:%M:%S')} (UTC)\n")
     output.write(f"Total de registros: {len(dados)}\n\n")
     
     for i, row in enumerate(dados, 1):
@@ -279,32 +409,31 @@ def exportar_txt(dados):
             output.write(f"Quantidade: {row['quantidade']}\n")
         output.write(f"Data: {row['data_registro']}\n\n")
     
-    output.seek(0)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename=avarias_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
-    response.headers['Content-Type'] = 'text/plain; charset=utf-8'
-    
-    return response
+    return output.getvalue()
 
-def exportar_json(dados):
-    """Exportar dados para JSON"""
+def exportar_json(dados, atualizado_em=None):
+    """Conteúdo JSON da exportação"""
     export_data = {
         'metadata': {
-            'generated_at': datetime.now().isoformat(),
+            'data_updated_at': atualizado_em.isoformat() if atualizado_em else None,
             'total_records': len(dados),
             'format': 'json'
         },
         'data': dados
     }
     
-    response = make_response(json.dumps(export_data, indent=2, ensure_ascii=False))
-    response.headers['Content-Disposition'] = f'attachment; filename=avarias_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    response.headers['Content-Type'] = 'application/json; charset=utf-8'
-    
-    return response
+    return json.dumps(export_data, indent=2, ensure_ascii=False)
+
+# Formato -> (gerador do conteúdo, mimetype; send_file acrescenta o charset de text/*)
+FORMATOS_EXPORTACAO = {
+    'csv': (exportar_csv, 'text/csv'),
+    'txt': (exportar_txt, 'text/plain'),
+    'json': (exportar_json, 'application/json'),
+}
 
 @bp.route('/admin/estatisticas')
+@somente_leitura
+@get_condicional
 def admin_estatisticas():
     """Página de estatísticas detalhadas"""
     try:
@@ -316,17 +445,23 @@ def admin_estatisticas():
             func.sum(Avaria.quantidade).label('quantidade_total')
         ).join(Avaria).group_by(Produto.tipo).all()
         
-        # Estatísticas por período (últimos 30 dias)
-        stats_periodo = []
-        for i in range(30):
-            data = datetime.now().date() - timedelta(days=i)
-            count = Avaria.query.filter(func.date(Avaria.data_registro) == data).count()
-            stats_periodo.append({
-                'data': data.strftime('%d/%m'),
-                'registros': count
-            })
+        # Tendências (média móvel, variação semanal, percentis, dias atípicos) quando o NumPy está instalado
+        analise = resumo_analitico()
         
-        stats_periodo.reverse()  # Ordem cronológica
+        # Estatísticas por período (últimos 30 dias)
+        if analise:
+            stats_periodo = analise['serie']
+        else:
+            stats_periodo = []
+            for i in range(30):
+                data = datetime.now().date() - timedelta(days=i)
+                count = Avaria.query.filter(func.date(Avaria.data_registro) == data).count()
+                stats_periodo.append({
+                    'data': data.strftime('%d/%m'),
+                    'registros': count
+                })
+            
+            stats_periodo.reverse()  # Ordem cronológica
         
         # Top 10 produtos com mais avarias
         top_produtos = db.session.query(
@@ -338,7 +473,8 @@ def admin_estatisticas():
         return render_template('admin/estatisticas.html', 
                              stats_tipo=stats_tipo,
                              stats_periodo=stats_periodo,
-                             top_produtos=top_produtos)
+                             top_produtos=top_produtos,
+                             analise=analise)
         
     except Exception as e:
         flash(f'Erro ao carregar estatísticas: {str(e)}', 'error')
@@ -376,6 +512,8 @@ def admin_limpar_confirmar():
             db.session.commit()
             flash(f'Todos os {count} registros foram removidos.', 'success')
         
+        publicar_avaria('recarregar', None)
+        
         return redirect(url_for('main.admin_dashboard'))
         
     except Exception as e:
@@ -431,6 +569,7 @@ def admin_editar_avaria(avaria_id):
             avaria.observacoes = novas_observacoes
             
             # Atualizar data se fornecida
+            data_anterior = avaria.data_registro
             if nova_data:
                 try:
                     avaria.data_registro = datetime.strptime(nova_data, '%Y-%m-%dT%H:%M')
@@ -439,6 +578,9 @@ def admin_editar_avaria(avaria_id):
                     return render_template('admin/editar_avaria.html', avaria=avaria, produto=produto)
             
             db.session.commit()
+            publicar_avaria('avaria_editada', avaria.id, produto, data_anterior=data_anterior,
+                            peso=avaria.peso, quantidade=avaria.quantidade,
+                            data_registro=avaria.data_registro)
             
             flash(f'Registro #{avaria.id} atualizado com sucesso!', 'success')
             return redirect(url_for('main.admin_registros'))
@@ -478,6 +620,7 @@ def admin_editar_produto(produto_id):
             if produto.tipo == 'interno':
                 produto.codigo_barras = novo_codigo
             db.session.commit()
+            publicar_avaria('recarregar', None)
             
             flash(f'Produto "{produto.nome}" atualizado com sucesso!', 'success')
             return redirect(url_for('main.admin_produtos'))
@@ -490,6 +633,9 @@ def admin_editar_produto(produto_id):
 
 @bp.route('/admin/produtos')
 @login_required
+@somente_leitura
+@get_condicional
+@orcamento_consultas(10)
 def admin_produtos():
     """Gestão de produtos"""
     try:
@@ -520,8 +666,14 @@ def admin_produtos():
             page=page, per_page=per_page, error_out=False
         )
         
+        # Avarias por produto da página em uma consulta (evita carregar produto.avarias de cada um)
+        avarias_por_produto = dict(db.session.query(
+            Avaria.produto_id, func.count(Avaria.id)
+        ).filter(Avaria.produto_id.in_([p.id for p in produtos.items])).group_by(Avaria.produto_id).all())
+        
         return render_template('admin/produtos.html', 
                              produtos=produtos,
+                             avarias_por_produto=avarias_por_produto,
                              filtros={
                                  'tipo': tipo_filtro,
                                  'busca': busca
@@ -538,9 +690,11 @@ def admin_deletar_avaria(avaria_id):
     try:
         avaria = Avaria.query.get_or_404(avaria_id)
         produto_nome = avaria.produto.nome
+        data_anterior = avaria.data_registro
         
         db.session.delete(avaria)
         db.session.commit()
+        publicar_avaria('avaria_excluida', avaria_id, data_anterior=data_anterior)
         
         flash(f'Registro de avaria #{avaria_id} ({produto_nome}) deletado com sucesso!', 'success')
         
@@ -549,6 +703,77 @@ def admin_deletar_avaria(avaria_id):
     
     return redirect(url_for('main.admin_registros'))
 
+def deslocar_data(coluna, dias):
+    """Expressão SQL que soma `dias` a uma coluna DateTime no dialeto do banco"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.datetime(coluna, f'{dias:+d} days')
+    return coluna + timedelta(days=dias)
+
+@bp.route('/admin/registros/lote', methods=['POST'])
+@login_required
+def admin_registros_lote():
+    """Reatribuir, deslocar a data ou excluir vários registros com um único UPDATE/DELETE"""
+    # Os filtros da listagem chegam na query string, como na exportação
+    voltar = redirect(url_for('main.admin_registros', **request.args))
+    try:
+        acao = request.form.get('acao')
+        
+        if request.form.get('escopo') == 'filtro':
+            # Subconsulta com os ids do filtro: as linhas não são carregadas na aplicação
+            ids = aplicar_filtros(db.session.query(Avaria.id).join(Produto), ler_filtros())
+            criterio = Avaria.id.in_(ids.scalar_subquery())
+        else:
+            ids = request.form.getlist('ids', type=int)
+            if not ids:
+                flash('Selecione ao menos um registro.', 'error')
+                return voltar
+            criterio = Avaria.id.in_(ids)
+        query = Avaria.query.filter(criterio)
+        
+        # synchronize_session=False: nada de carregar as linhas afetadas para a sessão
+        if acao == 'excluir':
+            afetados = query.delete(synchronize_session=False)
+            mensagem = f'{afetados} registros excluídos.'
+            
+        elif acao == 'reatribuir':
+            produto = Produto.query.filter_by(id=request.form.get('produto_id', type=int)).first()
+            if not produto:
+                flash('Produto de destino não encontrado.', 'error')
+                return voltar
+            # Hortifrúti usa peso e interno usa quantidade: não misturar os tipos
+            outro_tipo = db.session.query(func.count(Avaria.id)).join(Produto).filter(
+                criterio, Produto.tipo != produto.tipo
+            ).scalar()
+            if outro_tipo:
+                flash(f'{outro_tipo} dos registros escolhidos não são do tipo {produto.tipo}; '
+                      f'reatribua apenas registros do mesmo tipo do produto de destino.', 'error')
+                return voltar
+            afetados = query.update({Avaria.produto_id: produto.id}, synchronize_session=False)
+            mensagem = f'{afetados} registros reatribuídos a {produto.nome}.'
+            
+        elif acao == 'deslocar_data':
+            dias = request.form.get('dias', type=int)
+            if not dias or abs(dias) > 3650:
+                flash('Informe um deslocamento entre -3650 e 3650 dias.', 'error')
+                return voltar
+            afetados = query.update({Avaria.data_registro: deslocar_data(Avaria.data_registro, dias)},
+                                    synchronize_session=False)
+            mensagem = f'Data de {afetados} registros deslocada em {dias:+d} dias.'
+            
+        else:
+            flash('Ação em massa inválida.', 'error')
+            return voltar
+        
+        db.session.commit()
+        publicar_avaria('recarregar', None)
+        flash(mensagem, 'success')
+        
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro na ação em massa: {str(e)}', 'error')
+    
+    return voltar
+
 @bp.route('/admin/deletar/produto/<int:produto_id>', methods=['POST'])
 @login_required
 def admin_deletar_produto(produto_id):
@@ -561,6 +786,7 @@ def admin_deletar_produto(produto_id):
         # Deletar produto (cascade deleta as avarias)
         db.session.delete(produto)
         db.session.commit()
+        publicar_avaria('recarregar', None)
         
         flash(f'Produto "{produto_nome}" e {num_avarias} registros de avaria deletados com sucesso!', 'success')
         
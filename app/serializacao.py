@@ -0,0 +1,54 @@
+from flask import Response
+from datetime import timezone
+import json
+
+try:
+    import msgpack
+except ImportError:  # MessagePack é opcional: sem ele a API responde só JSON
+    msgpack = None
+
+MIMETYPE_JSON = 'application/json'
+MIMETYPES_MSGPACK = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+COLUNAS_REGISTROS = ('id', 'produto_id', 'data_registro', 'peso', 'quantidade', 'observacoes')
+COLUNAS_PRODUTOS = ('id', 'nome', 'tipo', 'codigo_barras')
+
+def _segundos(data):
+    # data_registro é gravado em UTC (datetime.utcnow) sem fuso
+    return int(data.replace(tzinfo=timezone.utc).timestamp()) if data else None
+
+def registros_colunares(itens):
+    """Pares (Avaria, Produto) em colunas, com cada produto uma única vez em tabela à parte"""
+    registros = {coluna: [] for coluna in COLUNAS_REGISTROS}
+    produtos = {coluna: [] for coluna in COLUNAS_PRODUTOS}
+    vistos = set()
+    for avaria, produto in itens:
+        registros['id'].append(avaria.id)
+        registros['produto_id'].append(produto.id)
+        registros['data_registro'].append(_segundos(avaria.data_registro))
+        registros['peso'].append(avaria.peso)
+        registros['quantidade'].append(avaria.quantidade)
+        registros['observacoes'].append(avaria.observacoes)
+        if produto.id not in vistos:
+            vistos.add(produto.id)
+            for coluna in COLUNAS_PRODUTOS:
+                produtos[coluna].append(getattr(produto, coluna))
+    return registros, produtos
+
+def formatos_oferecidos():
+    return (MIMETYPE_JSON,) + (MIMETYPES_MSGPACK if msgpack else ())
+
+def negociar(accept_mimetypes):
+    """Mimetype da resposta pelo Accept; None se nenhum formato oferecido serve"""
+    if not accept_mimetypes:
+        # Sem header Accept: JSON
+        return MIMETYPE_JSON
+    return accept_mimetypes.best_match(formatos_oferecidos())
+
+def codificar(dados, mimetype):
+    """Resposta compacta no formato negociado (JSON sem espaços ou MessagePack)"""
+    if mimetype in MIMETYPES_MSGPACK:
+        corpo = msgpack.packb(dados, use_bin_type=True)
+    else:
+        corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+    return Response(corpo, mimetype=mimetype)
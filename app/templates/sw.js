@@ -0,0 +1,86 @@
+// Gerado pelo servidor: versão e lista de pré-cache vêm dos hashes de app/static
+const CACHE_NAME = "sistema-avarias-{{ versao }}";
+// Respostas da API de registros para uso offline (mantido entre versões)
+const CACHE_DADOS = "sistema-avarias-dados";
+const urlsToCache = {{ urls_precache | tojson }};
+
+// Instalar Service Worker
+self.addEventListener("install", function (event) {
+  event.waitUntil(
+    caches.open(CACHE_NAME).then(function (cache) {
+      console.log("Cache aberto");
+      return cache.addAll(urlsToCache);
+    })
+  );
+});
+
+// Buscar recursos
+self.addEventListener("fetch", function (event) {
+  // Escritas e o feed SSE do dashboard sempre vão direto à rede
+  if (
+    event.request.method !== "GET" ||
+    event.request.headers.get("Accept") === "text/event-stream"
+  ) {
+    return;
+  }
+
+  // API de registros: rede primeiro, guardando a última resposta para uso offline
+  if (new URL(event.request.url).pathname.startsWith("/api/registros")) {
+    event.respondWith(
+      fetch(event.request)
+        .then(function (response) {
+          if (response.status === 200) {
+            const copia = response.clone();
+            caches.open(CACHE_DADOS).then(function (cache) {
+              cache.put(event.request, copia);
+            });
+          }
+          return response;
+        })
+        .catch(function () {
+          return caches.open(CACHE_DADOS).then(function (cache) {
+            return cache.match(event.request);
+          });
+        })
+    );
+    return;
+  }
+
+  // Páginas: rede primeiro, cache como fallback offline
+  if (event.request.mode === "navigate") {
+    event.respondWith(
+      fetch(event.request).catch(function () {
+        return caches.match(event.request);
+      })
+    );
+    return;
+  }
+
+  // Arquivos pré-cacheados (URLs com hash): cache primeiro
+  event.respondWith(
+    caches.match(event.request).then(function (response) {
+      // Cache hit - retorna resposta
+      if (response) {
+        return response;
+      }
+
+      return fetch(event.request);
+    })
+  );
+});
+
+// Atualizar Service Worker
+self.addEventListener("activate", function (event) {
+  event.waitUntil(
+    caches.keys().then(function (cacheNames) {
+      return Promise.all(
+        cacheNames.map(function (cacheName) {
+          if (cacheName !== CACHE_NAME && cacheName !== CACHE_DADOS) {
+            console.log("Removendo cache antigo:", cacheName);
+            return caches.delete(cacheName);
+          }
+        })
+      );
+    })
+  );
+});
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark das análises de /admin/estatisticas com muitos registros.
+
+Mede a carga das colunas de Avaria em arrays NumPy, o cálculo vetorizado
+(média móvel, variação semanal, percentis por produto, dias atípicos), o mesmo
+cálculo feito linha a linha em Python puro e a resposta em cache (mesma
+marca d'água de dados).
+
+Uso:
+    python benchmarks/analise.py                    # 1M registros em SQLite temporário
+    python benchmarks/analise.py --registros 200000 --produtos 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def popular(db, loja_id, registros, produtos, dias):
+    """Insere produtos e avarias direto pelo DBAPI, em lotes, para montar a massa rapidamente"""
+    agora = datetime.now()
+    conn = db.engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.executemany(
+            'INSERT INTO produto (id, loja_id, nome, tipo, codigo_barras, atualizado_em) VALUES (?, ?, ?, ?, ?, ?)',
+            [(i, loja_id, f'Produto {i}', 'hortifruti' if i % 2 else 'interno', None if i % 2 else f'{i:013d}', agora)
+             for i in range(1, produtos + 1)],
+        )
+        aleatorio = random.Random(42)
+        lote = 50000
+        for inicio in range(0, registros, lote):
+            linhas = []
+            for _ in range(min(lote, registros - inicio)):
+                produto_id = aleatorio.randint(1, produtos)
+                horti = produto_id % 2
+                data = agora - timedelta(minutes=aleatorio.randint(0, dias * 24 * 60))
+                linhas.append((loja_id, produto_id,
+                               round(aleatorio.uniform(0.1, 5), 2) if horti else None,
+                               None if horti else aleatorio.randint(1, 12), data, data))
+            cur.executemany(
+                'INSERT INTO avaria (loja_id, produto_id, peso, quantidade, data_registro, atualizado_em) '
+                'VALUES (?, ?, ?, ?, ?, ?)', linhas,
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+def calcular_python(linhas, hoje, janela, top):
+    """Referência linha a linha: mesmas métricas com dicionários e listas"""
+    por_dia, por_produto = {}, {}
+    for produto_id, peso, quantidade, data in linhas:
+        dia = datetime.strptime(data, '%Y-%m-%d').date() if isinstance(data, str) else data
+        if (hoje - dia).days < janela + 6:
+            por_dia[dia] = por_dia.get(dia, 0) + 1
+        valores = por_produto.setdefault(produto_id, ([], []))
+        if peso is not None:
+            valores[0].append(peso)
+        if quantidade is not None:
+            valores[1].append(quantidade)
+
+    serie = [por_dia.get(hoje - timedelta(days=d), 0) for d in range(janela + 5, -1, -1)]
+    media_movel = [sum(serie[i - 6:i + 1]) / 7 for i in range(6, len(serie))]
+    registros = serie[6:]
+    mediana = statistics.median(registros)
+    desvio = statistics.median(abs(r - mediana) for r in registros) * 1.4826 or statistics.pstdev(registros)
+    atipicos = [r for r in registros if desvio and (r - mediana) / desvio > 3.5]
+
+    principais = sorted(por_produto, key=lambda p: -(len(por_produto[p][0]) + len(por_produto[p][1])))[:top]
+    percentis = {}
+    for p in por_produto:
+        percentis[p] = [statistics.quantiles(v, n=10, method='inclusive') if len(v) > 1 else v
+                        for v in por_produto[p]]
+    return media_movel, atipicos, [percentis[p] for p in principais]
+
+def medir(funcao, repeticoes=3):
+    melhor, resultado = float('inf'), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=1_000_000)
+    parser.add_argument('--produtos', type=int, default=2000)
+    parser.add_argument('--dias', type=int, default=365)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'analise.db')
+
+    from flask import g
+    from sqlalchemy import select, func
+    from app import create_app, db
+    from app import analise
+    from app.models import Loja, Avaria
+
+    if analise.np is None:
+        print('❌ NumPy não está instalado: pip install numpy')
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        loja = Loja(nome='Benchmark')
+        db.session.add(loja)
+        db.session.commit()
+        loja_id = loja.id
+
+        inicio = time.perf_counter()
+        popular(db, loja_id, args.registros, args.produtos, args.dias)
+        print(f"🧪 {args.registros:,} registros, {args.produtos:,} produtos, {args.dias} dias "
+              f"(massa gerada em {time.perf_counter() - inicio:.1f}s)\n")
+
+    with app.test_request_context():
+        g.loja_id = loja_id
+        hoje = datetime.now().date()
+
+        t_carga, colunas = medir(analise.carregar_colunas, repeticoes=1)
+        t_vetor, _ = medir(lambda: analise.calcular(colunas, hoje))
+
+        linhas = db.session.execute(select(
+            Avaria.produto_id, Avaria.peso, Avaria.quantidade, func.date(Avaria.data_registro)
+        )).all()
+        t_python, _ = medir(lambda: calcular_python(linhas, hoje, analise.JANELA_DIAS, 10), repeticoes=1)
+
+        analise.resumo_analitico()
+        t_cache, _ = medir(analise.resumo_analitico, repeticoes=20)
+
+    memoria = sum(a.nbytes for a in colunas.values()) / 1024 / 1024
+    print(f"📥 Carga das colunas (1 consulta): {t_carga * 1000:9.1f} ms | {memoria:.1f} MB em arrays")
+    print(f"⚡ Cálculo vetorizado (NumPy):    {t_vetor * 1000:9.1f} ms")
+    print(f"🐢 Cálculo linha a linha (Python): {t_python * 1000:9.1f} ms")
+    print(f"💾 Resposta em cache:              {t_cache * 1000:9.3f} ms")
+    print(f"\n📈 Cálculo vetorizado {t_python / t_vetor:.0f}x mais rápido que o loop em Python")
+
+if __name__ == '__main__':
+    main()
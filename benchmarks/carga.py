@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Teste de carga simulando o chão de loja: muitos aparelhos registrando avarias
+e supervisores acompanhando o painel, contra a aplicação rodando em um
+servidor WSGI com vários workers (gunicorn se instalado; senão o servidor do
+Werkzeug com um processo por requisição).
+
+Relata vazão, latências p50/p95/p99 e taxa de erro por endpoint. Use --json
+para guardar o resultado e comparar a capacidade entre versões.
+
+Uso:
+    python benchmarks/carga.py                                   # SQLite temporário
+    DATABASE_URL=postgresql+pg8000://... python benchmarks/carga.py --workers 4
+    python benchmarks/carga.py --clientes 64 --segundos 60 \\
+        --mix interno=40,hortifruti=30,dashboard=15,registros=10,exportar=5 --json v2.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+USUARIO = ('carga', 'carga123')
+CODIGOS = [f'789{i:010d}' for i in range(200)]
+HORTIFRUTI = ['Tomate', 'Alface', 'Banana', 'Maçã', 'Cebola', 'Batata', 'Cenoura', 'Laranja', 'Mamão', 'Pepino']
+MIX_PADRAO = 'interno=40,hortifruti=30,dashboard=15,registros=10,exportar=5'
+
+class Cliente:
+    """Um aparelho ou supervisor: conexão keep-alive, cookies e ETags próprios"""
+
+    def __init__(self, porta):
+        self.conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+        self.cookies = {}
+        self.etags = {}
+        self.logado = False
+
+    def requisitar(self, metodo, caminho, formulario=None):
+        cabecalhos = {}
+        corpo = None
+        if self.cookies:
+            cabecalhos['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if formulario is not None:
+            corpo = urlencode(formulario)
+            cabecalhos['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif caminho in self.etags:
+            # Como o navegador: revalida a página que já tem
+            cabecalhos['If-None-Match'] = self.etags[caminho]
+        try:
+            self.conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+            resposta = self.conexao.getresponse()
+            resposta.read()
+        except (http.client.HTTPException, OSError):
+            # Conexão fechada pelo servidor: reabre na próxima requisição
+            self.conexao.close()
+            raise
+        for valor in resposta.headers.get_all('Set-Cookie') or []:
+            for nome, morsel in SimpleCookie(valor).items():
+                self.cookies[nome] = morsel.value
+        if resposta.headers.get('ETag'):
+            self.etags[caminho] = resposta.headers['ETag']
+        if resposta.headers.get('Connection', '').lower() == 'close':
+            self.conexao.close()
+        return resposta.status
+
+    def login(self):
+        status = self.requisitar('POST', '/auth/login', {'username': USUARIO[0], 'password': USUARIO[1]})
+        self.logado = status == 302
+        return self.logado
+
+# Operações: (função que executa, status considerados sucesso)
+def op_interno(cliente):
+    i = random.randrange(len(CODIGOS))
+    return cliente.requisitar('POST', '/registrar/interno', {
+        'codigo_barras': CODIGOS[i], 'nome_produto': f'Produto {i}', 'quantidade': random.randint(1, 5),
+    })
+
+def op_hortifruti(cliente):
+    return cliente.requisitar('POST', '/registrar/hortifruti', {
+        'nome_produto': random.choice(HORTIFRUTI), 'peso': round(random.uniform(0.1, 5), 2),
+    })
+
+def op_dashboard(cliente):
+    return cliente.requisitar('GET', '/admin')
+
+def op_registros(cliente):
+    return cliente.requisitar('GET', f'/admin/registros?page={random.randint(1, 5)}')
+
+def op_exportar(cliente):
+    formato = random.choice(['csv', 'json'])
+    return cliente.requisitar('GET', f'/admin/exportar/{formato}?tipo={random.choice(["todos", "hortifruti", "interno"])}')
+
+OPERACOES = {
+    'interno': (op_interno, {302}, False),
+    'hortifruti': (op_hortifruti, {302}, False),
+    'dashboard': (op_dashboard, {200, 304}, True),
+    'registros': (op_registros, {200, 304}, True),
+    'exportar': (op_exportar, {200}, True),
+}
+
+def ler_mix(texto):
+    mix = {}
+    for parte in texto.split(','):
+        nome, _, peso = parte.partition('=')
+        nome = nome.strip()
+        if nome not in OPERACOES:
+            raise SystemExit(f'Operação desconhecida no mix: {nome} (use {", ".join(OPERACOES)})')
+        mix[nome] = float(peso or 1)
+    return mix
+
+def preparar_banco():
+    """Cria tabelas, o usuário supervisor e os produtos usados pelos aparelhos"""
+    from app import create_app, db
+    from app.models import Usuario, Produto
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not Usuario.query.execution_options(todas_lojas=True).filter_by(username=USUARIO[0]).first():
+            usuario = Usuario(username=USUARIO[0], email=f'{USUARIO[0]}@localhost', is_admin=True)
+            usuario.set_password(USUARIO[1])
+            db.session.add(usuario)
+        # Produtos criados antes: a carga mede o registro das avarias, não o cadastro
+        existentes = {p.codigo_barras or p.nome for p in Produto.query.all()}
+        db.session.add_all(
+            [Produto(nome=f'Produto {i}', codigo_barras=c, tipo='interno')
+             for i, c in enumerate(CODIGOS) if c not in existentes]
+            + [Produto(nome=n, tipo='hortifruti') for n in HORTIFRUTI if n not in existentes]
+        )
+        db.session.commit()
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def iniciar_servidor(porta, workers, threads, env):
+    if shutil.which('gunicorn') or _importavel('gunicorn'):
+        comando = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--threads', str(threads),
+                   '-b', f'127.0.0.1:{porta}', '--log-level', 'warning', 'run:app']
+        descricao = f'gunicorn ({workers} workers x {threads} threads)'
+    else:
+        comando = [sys.executable, os.path.abspath(__file__), '--servir', str(porta), '--workers', str(workers)]
+        descricao = f'Werkzeug (até {workers} processos; instale gunicorn para um servidor de produção)'
+    processo = subprocess.Popen(comando, cwd=RAIZ, env=env)
+
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise SystemExit('❌ O servidor terminou durante a inicialização.')
+        try:
+            with socket.create_connection(('127.0.0.1', porta), timeout=1):
+                return processo, descricao
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise SystemExit('❌ O servidor não respondeu em 30s.')
+
+def _importavel(modulo):
+    try:
+        __import__(modulo)
+        return True
+    except ImportError:
+        return False
+
+def servir(porta, workers):
+    """Modo interno: servidor do Werkzeug quando o gunicorn não está instalado"""
+    import logging
+    from werkzeug.serving import run_simple
+    from run import app
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if workers > 1:
+        run_simple('127.0.0.1', porta, app, processes=workers, threaded=False)
+    else:
+        run_simple('127.0.0.1', porta, app, threaded=True)
+
+def executar(porta, clientes, segundos, aquecimento, mix, pausa_ms):
+    nomes, pesos = list(mix), list(mix.values())
+    amostras = {nome: [] for nome in nomes}
+    erros = {nome: {} for nome in nomes}
+    inicio_medicao = time.monotonic() + aquecimento
+    fim = inicio_medicao + segundos
+
+    def simular(semente):
+        aleatorio = random.Random(semente)
+        cliente = Cliente(porta)
+        while time.monotonic() < fim:
+            nome = aleatorio.choices(nomes, pesos)[0]
+            funcao, esperados, exige_login = OPERACOES[nome]
+            inicio = time.monotonic()
+            try:
+                if exige_login and not cliente.logado and not cliente.login():
+                    raise RuntimeError('login falhou')
+                status = funcao(cliente)
+                resultado = None if status in esperados else f'HTTP {status}'
+            except Exception as e:
+                resultado = type(e).__name__
+            if inicio >= inicio_medicao:
+                amostras[nome].append(time.monotonic() - inicio)
+                if resultado:
+                    erros[nome][resultado] = erros[nome].get(resultado, 0) + 1
+            if pausa_ms:
+                time.sleep(aleatorio.uniform(0.5, 1.5) * pausa_ms / 1000)
+
+    threads = [threading.Thread(target=simular, args=(i,)) for i in range(clientes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return amostras, erros
+
+def percentil(valores, q):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] if ordenados else float('nan')
+
+def resumir(amostras, erros, segundos):
+    resumo = {}
+    for nome, latencias in list(amostras.items()) + [('total', [x for v in amostras.values() for x in v])]:
+        falhas = sum(erros[nome].values()) if nome in erros else sum(sum(e.values()) for e in erros.values())
+        resumo[nome] = {
+            'requisicoes': len(latencias),
+            'por_segundo': round(len(latencias) / segundos, 1),
+            'p50_ms': round(percentil(latencias, 0.50) * 1000, 1),
+            'p95_ms': round(percentil(latencias, 0.95) * 1000, 1),
+            'p99_ms': round(percentil(latencias, 0.99) * 1000, 1),
+            'erros': falhas,
+            'taxa_erro': round(falhas / len(latencias) * 100, 2) if latencias else 0.0,
+            'tipos_erro': erros.get(nome, {}),
+        }
+    return resumo
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=32, help='aparelhos/supervisores simultâneos')
+    parser.add_argument('--segundos', type=float, default=30, help='duração da medição')
+    parser.add_argument('--aquecimento', type=float, default=3, help='segundos iniciais descartados')
+    parser.add_argument('--mix', default=MIX_PADRAO, help='pesos das operações (padrão: %(default)s)')
+    parser.add_argument('--pausa-ms', type=float, default=0, help='pausa média entre requisições de um cliente')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='threads por worker (gunicorn)')
+    parser.add_argument('--json', help='grava o resumo neste arquivo')
+    parser.add_argument('--servir', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(args.servir, args.workers)
+        return
+
+    mix = ler_mix(args.mix)
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'carga.db')
+    # Sem SSE: o feed em memória não funciona entre workers
+    env = dict(os.environ, DASHBOARD_TEMPO_REAL='0')
+    os.environ['DASHBOARD_TEMPO_REAL'] = '0'
+
+    preparar_banco()
+    porta = porta_livre()
+    servidor, descricao = iniciar_servidor(porta, args.workers, args.threads, env)
+    try:
+        print(f"🔗 Banco: {os.environ['DATABASE_URL'][:50]}")
+        print(f"🖥️  Servidor: {descricao}")
+        print(f"👥 {args.clientes} clientes | ⏱️  {args.segundos:.0f}s (+{args.aquecimento:.0f}s de aquecimento) | "
+              f"mix {','.join(f'{k}={v:g}' for k, v in mix.items())}\n")
+        amostras, erros = executar(porta, args.clientes, args.segundos, args.aquecimento, mix, args.pausa_ms)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=10)
+
+    resumo = resumir(amostras, erros, args.segundos)
+    print(f"{'endpoint':>11} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>7}")
+    for nome, r in resumo.items():
+        print(f"{nome:>11} {r['requisicoes']:7d} {r['por_segundo']:8.1f} {r['p50_ms']:8.1f} "
+              f"{r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['taxa_erro']:6.2f}%")
+    for nome, r in resumo.items():
+        if nome != 'total' and r['tipos_erro']:
+            print(f"   ⚠️  {nome}: {', '.join(f'{k} x{v}' for k, v in r['tipos_erro'].items())}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'servidor': descricao,
+                'banco': os.environ['DATABASE_URL'].split('://')[0],
+                'clientes': args.clientes,
+                'segundos': args.segundos,
+                'mix': mix,
+                'resultado': resumo,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resumo gravado em {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Teste de concorrência do SQLite: um leitor longo (como uma exportação)
+mantém uma transação de leitura aberta enquanto vários "aparelhos" gravam.
+
+Compara o modo padrão (rollback journal) com o perfil de produção
+(WAL + synchronous=NORMAL + busy_timeout ...). No modo padrão as gravações
+esperam o leitor terminar ou falham com "database is locked"; no perfil de
+produção seguem sem bloqueio.
+
+Uso:
+    python benchmarks/concorrencia_sqlite.py --escritores 8 --leitura-s 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from app.perfil_sqlite import pragmas, aplicar_pragmas
+
+def preparar(caminho, perfil):
+    engine = create_engine(f'sqlite:///{caminho}', connect_args={'timeout': perfil['busy_s']})
+    if perfil['pragmas']:
+        event.listen(engine, 'connect', lambda conn, _: aplicar_pragmas(conn, perfil['pragmas']))
+    with engine.begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE avaria (id INTEGER PRIMARY KEY, peso REAL, data_registro TEXT)')
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50000) "
+            "INSERT INTO avaria (peso, data_registro) SELECT i * 0.1, datetime('now') FROM n"
+        )
+    return engine
+
+def executar(engine, escritores, leitura_s):
+    latencias, erros = [], []
+    leitor_pronto = threading.Event()
+    fim = threading.Event()
+
+    def leitor():
+        # Transação de leitura longa, como admin_exportar sobre muitos registros
+        conn = engine.raw_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute('BEGIN')
+            cur.execute('SELECT count(*), sum(peso) FROM avaria').fetchone()
+            leitor_pronto.set()
+            time.sleep(leitura_s)
+            cur.execute('SELECT count(*) FROM avaria').fetchone()
+            conn.rollback()
+        finally:
+            conn.close()
+            fim.set()
+
+    def escritor():
+        leitor_pronto.wait()
+        conn = engine.raw_connection()
+        try:
+            while not fim.is_set():
+                inicio = time.monotonic()
+                try:
+                    cur = conn.cursor()
+                    cur.execute("INSERT INTO avaria (peso, data_registro) VALUES (1.0, datetime('now'))")
+                    conn.commit()
+                    latencias.append(time.monotonic() - inicio)
+                except Exception as e:
+                    conn.rollback()
+                    erros.append(str(e))
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=leitor)] + [threading.Thread(target=escritor) for _ in range(escritores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencias, erros
+
+def percentil(valores, q):
+    if not valores:
+        return float('nan')
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escritores', type=int, default=8)
+    parser.add_argument('--leitura-s', type=float, default=3)
+    parser.add_argument('--busy-ms', type=int, default=1000, help='busy_timeout dos escritores')
+    args = parser.parse_args()
+
+    config = {
+        'SQLITE_BUSY_TIMEOUT_MS': args.busy_ms,
+        'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+        'SQLITE_CACHE_SIZE_KB': 64 * 1024,
+    }
+    perfis = {
+        'padrão': {'pragmas': [], 'busy_s': args.busy_ms / 1000},
+        'produção': {'pragmas': pragmas(config), 'busy_s': args.busy_ms / 1000},
+    }
+
+    print(f"👥 {args.escritores} escritores | 📖 leitor segura a transação por {args.leitura_s:.0f}s\n")
+    falhas = 0
+    for nome, perfil in perfis.items():
+        caminho = os.path.join(tempfile.mkdtemp(), 'concorrencia.db')
+        engine = preparar(caminho, perfil)
+        latencias, erros = executar(engine, args.escritores, args.leitura_s)
+        engine.dispose()
+        print(f"{nome:>9}: {len(latencias):6d} gravações | {len(erros):4d} 'database is locked' | "
+              f"p50 {percentil(latencias, 0.5) * 1000:7.1f} ms | p99 {percentil(latencias, 0.99) * 1000:7.1f} ms")
+        if nome == 'produção' and (erros or not latencias):
+            falhas += 1
+
+    if falhas:
+        print('\n❌ Com o perfil de produção as gravações ainda foram bloqueadas pelo leitor.')
+        sys.exit(1)
+    print('\n✅ Com o perfil de produção leitor e escritores não se bloquearam.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ingestão: registros/s sustentados pelo caminho direto
+(um commit por avaria) versus o buffer de ingestão em lote.
+
+Uso:
+    python benchmarks/ingestao.py                      # SQLite temporário
+    DATABASE_URL=postgresql+pg8000://... python benchmarks/ingestao.py
+    python benchmarks/ingestao.py --clientes 32 --segundos 15
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def registrar(c, i):
+    return c.post('/registrar/interno', data={
+        'codigo_barras': f'789{i % 8:010d}',
+        'nome_produto': f'Produto {i % 8}',
+        'quantidade': '1',
+    })
+
+def executar(app, clientes, segundos):
+    """Dispara POSTs em /registrar/interno a partir de vários clientes simultâneos"""
+    total = [0] * clientes
+    erros = [0] * clientes
+    fim = time.monotonic() + segundos
+
+    def cliente(i):
+        c = app.test_client()
+        while time.monotonic() < fim:
+            r = registrar(c, i)
+            if r.status_code == 302:
+                total[i] += 1
+            else:
+                erros[i] += 1
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    inicio = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(total), sum(erros), time.monotonic() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--intervalo-ms', type=int, default=20)
+    parser.add_argument('--max-itens', type=int, default=100)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    from app import create_app, db
+    from app.ingestao import BufferIngestao
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    # Produtos criados antes da medição: o benchmark mede só a gravação das avarias
+    c = app.test_client()
+    for i in range(8):
+        registrar(c, i)
+
+    print(f"🔗 Banco: {os.environ['DATABASE_URL'][:50]}")
+    print(f"👥 Clientes: {args.clientes} | ⏱️  {args.segundos:.0f}s por modo\n")
+
+    resultados = {}
+    for modo in ('direto', 'lote'):
+        app.extensions.pop('ingestao', None)
+        if modo == 'lote':
+            app.extensions['ingestao'] = BufferIngestao(app, args.intervalo_ms, args.max_itens)
+        total, erros, duracao = executar(app, args.clientes, args.segundos)
+        resultados[modo] = total / duracao
+        print(f"{modo:>7}: {total:7d} registros | {erros:5d} erros | {total / duracao:9.1f} registros/s")
+
+    if resultados['direto']:
+        print(f"\n📈 Ganho do modo em lote: {resultados['lote'] / resultados['direto']:.2f}x")
+
+if __name__ == '__main__':
+    main()
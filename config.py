@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-change-in-production'
@@ -12,6 +13,41 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Perfil de produção do fallback SQLite (WAL, synchronous=NORMAL, ...)
+    SQLITE_PERFIL_PRODUCAO = os.environ.get('SQLITE_PERFIL_PRODUCAO', '1').lower() in ('1', 'true', 'sim')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    
+    # Réplica de leitura opcional (painéis, estatísticas e exportações)
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    if DATABASE_REPLICA_URL and DATABASE_REPLICA_URL.startswith('postgres://'):
+        DATABASE_REPLICA_URL = DATABASE_REPLICA_URL.replace('postgres://', 'postgresql://', 1)
+    
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    # Segundos em que a sessão lê do primário após uma escrita própria
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+    
+    # Ingestão em lote (apenas para servidores de longa duração, não na Vercel)
+    INGESTAO_EM_LOTE = os.environ.get('INGESTAO_EM_LOTE', '').lower() in ('1', 'true', 'sim')
+    INGESTAO_INTERVALO_MS = int(os.environ.get('INGESTAO_INTERVALO_MS', 20))
+    INGESTAO_MAX_ITENS = int(os.environ.get('INGESTAO_MAX_ITENS', 100))
+    
+    # Feed SSE do dashboard, opcional (pub/sub em memória: requer um único processo
+    # com threads; em workers síncronos cada aba aberta prende um worker)
+    DASHBOARD_TEMPO_REAL = os.environ.get('DASHBOARD_TEMPO_REAL', '0').lower() in ('1', 'true', 'sim')
+    
+    # Inspeção de consultas por requisição (desenvolvimento/testes): avisa quando o
+    # mesmo formato de SQL roda mais de N vezes e, no modo estrito, falha as rotas
+    # que estouram o orçamento de @orcamento_consultas
+    INSPECAO_CONSULTAS = os.environ.get('INSPECAO_CONSULTAS', '').lower() in ('1', 'true', 'sim')
+    INSPECAO_LIMITE_REPETICOES = int(os.environ.get('INSPECAO_LIMITE_REPETICOES', 5))
+    INSPECAO_ESTRITA = os.environ.get('INSPECAO_ESTRITA', '').lower() in ('1', 'true', 'sim')
+    
+    # Cache em disco das exportações (na Vercel só /tmp é gravável)
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'avarias_export_cache')
+    EXPORT_CACHE_MAX_MB = int(os.environ.get('EXPORT_CACHE_MAX_MB', 200))
+    
     # Configurações do Supabase
     SUPABASE_URL = os.environ.get('SUPABASE_URL')
     SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
@@ -8,7 +8,9 @@ import os
 from dotenv import load_dotenv
 from flask import Flask
 from app import create_app, db
-from app.models import Usuario, Produto, Avaria
+from app.models import Usuario, Produto, Avaria, Loja
+from app.lojas import NOME_LOJA_PADRAO
+from app.esquema import atualizar_esquema
 from werkzeug.security import generate_password_hash
 
 # Carregar variáveis de ambiente
@@ -27,10 +29,17 @@ def init_db_with_flask():
         with app.app_context():
             print("📋 Criando tabelas com SQLAlchemy...")
             
-            # Criar todas as tabelas
-            db.create_all()
+            # Criar as tabelas e atualizar as de bancos antigos (lojas, índices)
+            for alteracao in atualizar_esquema():
+                print(f"   🔧 {alteracao}")
             print("✅ Tabelas criadas com sucesso!")
             
+            # Garantir a loja padrão (usuários, produtos e avarias pertencem a uma loja)
+            if not Loja.query.first():
+                print("🏪 Criando loja padrão...")
+                db.session.add(Loja(nome=NOME_LOJA_PADRAO))
+                db.session.commit()
+            
             # Verificar se já existe um usuário admin
             admin_exists = Usuario.query.filter_by(username='admin').first()
             
@@ -69,11 +78,13 @@ def init_db_with_flask():
                 print("✅ Usuário administrador já existe.")
             
             # Verificar dados
+            total_lojas = Loja.query.count()
             total_usuarios = Usuario.query.count()
             total_produtos = Produto.query.count()
             total_avarias = Avaria.query.count()
             
             print(f"\n📊 Dados no banco:")
+            print(f"   🏪 Lojas: {total_lojas}")
             print(f"   👥 Usuários: {total_usuarios}")
             print(f"   📦 Produtos: {total_produtos}")
             print(f"   ⚠️  Avarias: {total_avarias}")